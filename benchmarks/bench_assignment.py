@@ -0,0 +1,59 @@
+"""Assignment solvers of arrays without order on random, sparse, distinct and tied scores
+
+    python benchmarks/bench_assignment.py
+    python benchmarks/bench_assignment.py --sizes 2000 --kinds ties
+    python benchmarks/bench_assignment.py --kinds distinct --solvers km km+cc
+"""
+import numpy as np
+
+from common import make_parser, timed
+from jycm.km_matcher import ComponentMatcher, KMMatcher, LAPJVMatcher, linear_sum_assignment
+
+
+def make_weights(kind, size, rng):
+    if kind == "random":
+        return rng.random((size, size))
+    if kind == "sparse":
+        # most items are not similar at all
+        return np.where(rng.random((size, size)) < 0.01, rng.choice([0.25, 0.5, 0.75], size=(size, size)), 0)
+    if kind == "distinct":
+        # every item is similar to its changed version and a few items are similar to each other
+        weights = np.diag(rng.choice([0.5, 0.75], size=size))
+        weights[rng.integers(0, size, size // 10), rng.integers(0, size, size // 10)] = 0.25
+        return weights
+    if kind == "ties":
+        # items of the same shape with a few different fields
+        return rng.choice([0.5, 0.6, 0.7], size=(size, size))
+    raise ValueError(kind)
+
+
+SOLVERS = {
+    "km": lambda weights: KMMatcher(weights),
+    "lapjv": lambda weights: LAPJVMatcher(weights, use_scipy=False),
+    "scipy": lambda weights: LAPJVMatcher(weights, use_scipy=True),
+    "km+cc": lambda weights: ComponentMatcher(weights, matcher=KMMatcher),
+    "lapjv+cc": lambda weights: ComponentMatcher(weights, matcher=lambda w: LAPJVMatcher(w, use_scipy=False)),
+}
+
+
+def main():
+    parser = make_parser(__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[300, 1000])
+    parser.add_argument("--kinds", nargs="+", default=["random", "sparse", "distinct", "ties"])
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS.keys()))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        for kind in args.kinds:
+            weights = make_weights(kind, size, rng)
+            for solver in args.solvers:
+                if solver == "scipy" and linear_sum_assignment is None:
+                    print(f"size={size:>5} kind={kind:<7} solver={solver:<8} skipped: scipy is not installed")
+                    continue
+                (total, _), cost = timed(SOLVERS[solver](weights).solve)
+                print(f"size={size:>5} kind={kind:<7} solver={solver:<8} {cost:.3f}s total={total:.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Time and memory of diffing a document of ~100k nodes
+
+Every level of the document adds a key to the paths of the cache keys below it.
+
+    python benchmarks/bench_cache_keys.py
+    python benchmarks/bench_cache_keys.py --depth 9 --width 2 --no-fingerprint
+"""
+import copy
+import random
+
+from common import make_parser, timed, traced
+from jycm.jycm import YouchamaJsonDiffer
+
+
+def make_doc(depth, width, leaves):
+    """A dict of `depth` levels with `width` keys per level and `leaves` items at the bottom
+
+    """
+    if depth == 0:
+        return [{"id": i, "name": f"leaf-{i}", "tags": ["a", "b"]} for i in range(leaves)]
+    return {f"key-{i}": make_doc(depth - 1, width, leaves) for i in range(width)}
+
+
+def count_nodes(value):
+    if isinstance(value, dict):
+        return 1 + sum(count_nodes(v) for v in value.values())
+    if isinstance(value, list):
+        return 1 + sum(count_nodes(v) for v in value)
+    return 1
+
+
+def mutate(value, rng, ratio):
+    if isinstance(value, dict):
+        for k in value:
+            if isinstance(value[k], (dict, list)):
+                mutate(value[k], rng, ratio)
+            elif rng.random() < ratio:
+                value[k] = "changed"
+    elif isinstance(value, list):
+        for v in value:
+            mutate(v, rng, ratio)
+
+
+def main():
+    parser = make_parser(__doc__)
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--leaves", type=int, default=8)
+    parser.add_argument("--ratio", type=float, default=0.05)
+    parser.add_argument("--no-fingerprint", action="store_true")
+    args = parser.parse_args()
+
+    left = make_doc(args.depth, args.width, args.leaves)
+    right = copy.deepcopy(left)
+    mutate(right, random.Random(0), args.ratio)
+
+    def run():
+        ycm = YouchamaJsonDiffer(left, right, use_fingerprint=not args.no_fingerprint)
+        ycm.diff()
+        return ycm
+
+    ycm, cost = timed(run)
+    _, _, peak = traced(run)
+
+    print(f"nodes={count_nodes(left)} cost={cost:.3f}s peak={peak:.1f}MiB "
+          f"cache_entries={len(ycm.cache)} value_changes={len(ycm.to_dict().get('value_changes', []))}")
+
+
+if __name__ == '__main__':
+    main()
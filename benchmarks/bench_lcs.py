@@ -0,0 +1,69 @@
+"""Regression benchmark of arrays with order
+
+The LCS of long arrays is backtracked without recursion, so any size is fine.
+The table engines fill an (n + 1) * (m + 1) table, so they are skipped above MAX_TABLE_SIZE items: the pure python
+table takes about a second at 1200 items and grows quadratically. Raise the caps with --max-table-size to run them.
+
+    python benchmarks/bench_lcs.py
+    python benchmarks/bench_lcs.py --sizes 10000 50000 --engines myers
+    python benchmarks/bench_lcs.py --sizes 2000 --max-table-size 2000
+"""
+import copy
+
+from common import make_parser, timed
+from jycm.jycm import LCS_ENGINE_MYERS, LCS_ENGINE_TABLE, LCS_ENGINE_VECTORIZED, YouchamaJsonDiffer
+
+# (n + 1) * (m + 1) tables are only built up to this size
+MAX_TABLE_SIZE = {
+    LCS_ENGINE_TABLE: 1000,
+    LCS_ENGINE_VECTORIZED: 10000,
+    LCS_ENGINE_MYERS: None
+}
+
+
+def make_pair(size):
+    left = {"list": [{"id": i, "value": f"value-{i}"} for i in range(size)]}
+    right = copy.deepcopy(left)
+
+    right["list"][size // 3]["value"] = "changed"
+    right["list"].insert(size // 2, {"id": -1, "value": "inserted"})
+    del right["list"][size - 10]
+    return left, right
+
+
+def run(size, engine):
+    left, right = make_pair(size)
+
+    def diff():
+        ycm = YouchamaJsonDiffer(left, right, lcs_engine=engine)
+        ycm.diff()
+        return ycm.to_dict(no_pairs=True)
+
+    result, cost = timed(diff)
+
+    assert len(result["value_changes"]) == 1
+    assert len(result["list:add"]) == 1
+    assert len(result["list:remove"]) == 1
+    return cost
+
+
+def main():
+    parser = make_parser(__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--engines", nargs="+", default=[LCS_ENGINE_TABLE, LCS_ENGINE_VECTORIZED, LCS_ENGINE_MYERS])
+    parser.add_argument("--max-table-size", type=int, default=None, help="cap of both table engines")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        for engine in args.engines:
+            max_size = MAX_TABLE_SIZE[engine]
+            if max_size is not None and args.max_table_size is not None:
+                max_size = args.max_table_size
+            if max_size is not None and size > max_size:
+                print(f"size={size:>6} engine={engine:<10} skipped: quadratic table")
+                continue
+            print(f"size={size:>6} engine={engine:<10} {run(size, engine):.3f}s")
+
+
+if __name__ == '__main__':
+    main()
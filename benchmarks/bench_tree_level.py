@@ -0,0 +1,50 @@
+"""Allocations of TreeLevel on deep documents
+
+A TreeLevel has no __dict__ and keeps only its own path segments; full paths are built on demand.
+
+    python benchmarks/bench_tree_level.py
+    python benchmarks/bench_tree_level.py --depth 200 --width 50
+"""
+import sys
+
+from common import make_parser, timed, traced
+from jycm.jycm import TreeLevel, YouchamaJsonDiffer
+
+
+def make_doc(depth, width, value):
+    """`width` chains of dicts nested `depth` levels deep
+
+    """
+    doc = {}
+    for w in range(width):
+        current = doc[f"chain-{w}"] = {}
+        for d in range(depth):
+            current["value"] = value if d % 10 == 0 else d
+            current = current.setdefault("next", {})
+    return doc
+
+
+def main():
+    parser = make_parser(__doc__)
+    parser.add_argument("--depth", type=int, default=100)
+    parser.add_argument("--width", type=int, default=200)
+    args = parser.parse_args()
+
+    left, right = make_doc(args.depth, args.width, "left"), make_doc(args.depth, args.width, "right")
+
+    def run():
+        ycm = YouchamaJsonDiffer(left, right, use_cache=False, use_fingerprint=False)
+        ycm.diff()
+        return ycm
+
+    _, cost = timed(run)
+    ycm, current, peak = traced(run)
+
+    level = TreeLevel(left=1, right=1, left_path=[], right_path=[], up=None)
+    print(f"cost={cost:.3f}s retained={current:.1f}MiB peak={peak:.1f}MiB "
+          f"records={sum(len(v) for v in ycm.records.values())} level_size={sys.getsizeof(level)}B "
+          f"has_dict={hasattr(level, '__dict__')}")
+
+
+if __name__ == '__main__':
+    main()
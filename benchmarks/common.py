@@ -0,0 +1,39 @@
+"""Shared setup of the benchmarks
+
+"""
+import argparse
+import time
+import tracemalloc
+
+
+def make_parser(doc: str) -> argparse.ArgumentParser:
+    """Argument parser of a benchmark whose help shows the usage of its docstring
+
+    """
+    return argparse.ArgumentParser(description=doc, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+
+def timed(func, *args, **kwargs):
+    """Run func once
+
+    Returns:
+        (result, seconds)
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def traced(func, *args, **kwargs):
+    """Run func once under tracemalloc; it slows everything down, so time is measured by another run
+
+    Returns:
+        (result, MiB still allocated when func returns, peak MiB)
+    """
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current / 2 ** 20, peak / 2 ** 20
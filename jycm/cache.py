@@ -0,0 +1,225 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple, Union
+
+# a score, or how items of arrays are matched as nested tuples of indices
+CacheValue = Union[float, Tuple]
+
+
+class ScoreCache:
+    """Memo of diff_level scores without any limit
+
+    Keys are (left_path_id, right_path_id, drill). Path ids are only meaningful inside one differ,
+    so a cache must not be shared by differs.
+    The report phase visits every pair of paths once, so dropping an entry only costs a re-computation in drill mode.
+    The differ also keeps how items of arrays are matched in drill mode, as tuples of indices under
+    (left_path_id, right_path_id, kind, "matching"), which the report phase replays by peek.
+
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: Dict[Hashable, CacheValue] = {}
+
+    def get(self, key: Hashable) -> Union[CacheValue, None]:
+        """Get a score and count the hit or miss
+
+        Args:
+            key: the cache key
+
+        Returns:
+            The score or None if missing
+        """
+        score = self._entries.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def peek(self, key: Hashable) -> Union[CacheValue, None]:
+        """Get a score without counting a hit or miss
+
+        Args:
+            key: the cache key
+
+        Returns:
+            The score or None if missing
+        """
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, score: CacheValue):
+        """Save a score
+
+        Args:
+            key: the cache key
+            score: the score
+        """
+        self._entries[key] = score
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get counters of the cache
+
+        Returns:
+            A dict of hits, misses, evictions and size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self)
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+class LRUScoreCache(ScoreCache):
+    """Keep at most max_entries scores; the least recently used one is evicted first
+
+    Args:
+        max_entries: max number of scores
+    """
+
+    def __init__(self, max_entries: int):
+        super().__init__()
+        if max_entries <= 0:
+            raise ValueError(f"max_entries=[{max_entries}] should be positive")
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, CacheValue]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Union[CacheValue, None]:
+        score = super().get(key)
+        if score is not None:
+            self._entries.move_to_end(key)
+        return score
+
+    def put(self, key: Hashable, score: CacheValue):
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while self._is_full():
+            self._evict()
+
+    def _is_full(self) -> bool:
+        return len(self._entries) > self.max_entries
+
+    def _evict(self):
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+
+class MaxBytesScoreCache(LRUScoreCache):
+    """Keep the estimated memory of scores under max_bytes; the least recently used one is evicted first
+
+    Every entry is weighed as the size of its key and score plus a fixed overhead of the underlying dict.
+
+    Args:
+        max_bytes: max estimated memory in bytes
+    """
+
+    # slot of the hash table and node of the linked list of an OrderedDict entry
+    ENTRY_OVERHEAD = 100
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_entries=sys.maxsize)
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes=[{max_bytes}] should be positive")
+        self.max_bytes = max_bytes
+        self.size_in_bytes = 0
+
+    @classmethod
+    def weigh(cls, key: Any, score: CacheValue) -> int:
+        size = cls.ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(score)
+        if type(key) == tuple:
+            size += sum(sys.getsizeof(k) for k in key)
+
+        # matchings of arrays are nested tuples / lists of indices
+        stack = [score]
+        while len(stack) > 0:
+            value = stack.pop()
+            if type(value) == tuple or type(value) == list:
+                size += sum(sys.getsizeof(v) for v in value)
+                stack.extend(value)
+        return size
+
+    def put(self, key: Hashable, score: CacheValue):
+        previous = self._entries.get(key)
+        if previous is not None:
+            self.size_in_bytes -= self.weigh(key, previous)
+        self.size_in_bytes += self.weigh(key, score)
+        super().put(key, score)
+
+    def _is_full(self) -> bool:
+        return self.size_in_bytes > self.max_bytes and len(self._entries) > 0
+
+    def _evict(self):
+        key, score = self._entries.popitem(last=False)
+        self.size_in_bytes -= self.weigh(key, score)
+        self.evictions += 1
+
+    def clear(self):
+        super().clear()
+        self.size_in_bytes = 0
+
+
+class DrillOnlyScoreCache(ScoreCache):
+    """Only cache scores computed in drill mode
+
+    Scores of the report phase are never asked twice, so they are not kept at all.
+    Drill scores are saved in another cache policy, which is unbounded by default.
+
+    Args:
+        cache: where drill scores are saved
+    """
+
+    def __init__(self, cache: Union[ScoreCache, None] = None):
+        super().__init__()
+        self.cache = cache if cache is not None else ScoreCache()
+
+    @staticmethod
+    def _is_drill(key: Hashable) -> bool:
+        return type(key) == tuple and len(key) > 0 and bool(key[-1])
+
+    def get(self, key: Hashable) -> Union[CacheValue, None]:
+        if not self._is_drill(key):
+            self.misses += 1
+            return None
+        score = self.cache.get(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def peek(self, key: Hashable) -> Union[CacheValue, None]:
+        if not self._is_drill(key):
+            return None
+        return self.cache.peek(key)
+
+    def put(self, key: Hashable, score: CacheValue):
+        if self._is_drill(key):
+            self.cache.put(key, score)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **super().stats(),
+            "evictions": self.cache.evictions
+        }
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __contains__(self, key):
+        return key in self.cache
@@ -1,5 +1,8 @@
 PLACE_HOLDER_NON_EXIST = "__NON_EXIST__"
 
+# key of a value referenced by its side ("left" or "right") and path instead of being copied
+VALUE_REF = "__REF__"
+
 EVENT_PAIR = "just4vis:pairs"
 EVENT_DICT_REMOVE = "dict:remove"
 EVENT_DICT_ADD = "dict:add"
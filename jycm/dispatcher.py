@@ -0,0 +1,126 @@
+import re
+from typing import TYPE_CHECKING, Dict, Iterator, List, Pattern, Tuple, Union
+
+from jycm.common import PLACE_HOLDER_NON_EXIST
+from jycm.helper import combine_regexes, is_index_agnostic, make_json_path_key
+from jycm.operator import BaseOperator
+from jycm.path import PathNode, StructuralPaths
+
+if TYPE_CHECKING:
+    from jycm.jycm import TreeLevel
+
+
+class OperatorDispatcher:
+    """Find the custom operators matching a level without running every regex on every level
+
+    Operators which keep BaseOperator.match only look at the path, so their matches are computed once per path and
+    cached by the id of the interned path. Regexes which can not tell array indices apart (see is_index_agnostic) are
+    even cached once per structural path, i.e. the path with every index replaced by 0, so all items of an array
+    share one lookup. The other regexes are prefiltered by one combined regex.
+    Operators overriding `match` are asked on every level.
+
+    Args:
+        operators: the custom operators in order
+    """
+
+    def __init__(self, operators: List[BaseOperator]):
+        self.operators = operators
+
+        self.dynamic_indices: List[int] = []
+        self._agnostic_indices: List[int] = []
+        self._specific_indices: List[int] = []
+        for k, operator in enumerate(operators):
+            if type(operator).match is not BaseOperator.match:
+                self.dynamic_indices.append(k)
+            elif operator.regex.flags == re.compile("").flags and is_index_agnostic(operator.regex.pattern):
+                self._agnostic_indices.append(k)
+            else:
+                self._specific_indices.append(k)
+
+        self._dynamic_index_set = set(self.dynamic_indices)
+        self._prefilter = self._build_prefilter()
+
+        self._structural_paths = StructuralPaths()
+        self._by_structure: Dict[int, Tuple[int, ...]] = {}
+        self._by_path: Dict[int, Tuple[int, ...]] = {}
+
+    def _build_prefilter(self) -> Union[Pattern, None]:
+        """One regex matching if any index specific regex matches; None if they can not be combined
+
+        """
+        if len(self._specific_indices) < 2:
+            return None
+        return combine_regexes([self.operators[k].regex for k in self._specific_indices])
+
+    def match_path(self, node: PathNode) -> Tuple[int, ...]:
+        """Indices of operators keeping BaseOperator.match whose regex matches a path
+
+        Args:
+            node: the interned path
+
+        Returns:
+            Indices of operators in ascending order
+        """
+        indices = self._by_path.get(node.id)
+        if indices is not None:
+            return indices
+
+        indices = ()
+        if len(self._agnostic_indices) > 0:
+            structural_node = self._structural_paths.get(node)
+            indices = self._by_structure.get(structural_node.id)
+            if indices is None:
+                path_key = make_json_path_key(structural_node.to_list())
+                indices = tuple(k for k in self._agnostic_indices if self.operators[k].regex.search(path_key))
+                self._by_structure[structural_node.id] = indices
+
+        if len(self._specific_indices) > 0:
+            path_key = make_json_path_key(node.to_list())
+            if self._prefilter is None or self._prefilter.search(path_key) is not None:
+                specific = [k for k in self._specific_indices if self.operators[k].regex.search(path_key)]
+                if len(specific) > 0:
+                    indices = tuple(sorted([*indices, *specific]))
+
+        self._by_path[node.id] = indices
+        return indices
+
+    def may_match(self, node: PathNode) -> bool:
+        """Whether any operator may match a level of a path
+
+        Args:
+            node: the interned path
+
+        Returns:
+            False only if no operator can match a level of the path
+        """
+        if len(self.dynamic_indices) > 0:
+            return True
+        if len(self._agnostic_indices) == 0 and len(self._specific_indices) == 0:
+            return False
+        return len(self.match_path(node)) > 0
+
+    def match(self, level: 'TreeLevel', left_path_node: PathNode, right_path_node: PathNode) -> Iterator[BaseOperator]:
+        """Operators matching a level in order
+
+        Operators overriding `match` are asked lazily, as a loop over all operators would.
+
+        Args:
+            level: the tree level
+            left_path_node: the interned left path of the level
+            right_path_node: the interned right path of the level
+
+        Returns:
+            Same as (operator for operator in operators if operator.match(level))
+        """
+        # the same path as TreeLevel.get_path
+        node = left_path_node if level.left != PLACE_HOLDER_NON_EXIST else right_path_node
+        indices = self.match_path(node)
+        if len(self.dynamic_indices) == 0:
+            for k in indices:
+                yield self.operators[k]
+            return
+
+        matched = set(indices)
+        for k, operator in enumerate(self.operators):
+            if k in matched or (k in self._dynamic_index_set and operator.match(level)):
+                yield operator
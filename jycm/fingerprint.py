@@ -0,0 +1,248 @@
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Union
+
+from jycm.path import PathNode, PathRegistry
+
+
+class Fingerprint(NamedTuple):
+    """Structural fingerprint of a container
+
+    Args:
+        strict: canonical id shared by all structurally identical values; None if the value can not be fingerprinted
+        loose: canonical id ignoring order of arrays and numeric types; values whose loose ids are different
+            can never be diffed to 1. None if unknown.
+        tainted: whether a custom operator may match this value or anything below it
+    """
+    strict: Union[int, None]
+    loose: Union[int, None]
+    tainted: bool
+
+
+class FingerprintIndex:
+    """Merkle-style fingerprints of every dict / list of the left and right json; tuples are taken as lists
+
+    Fingerprints are computed bottom-up in one pass per side. Structurally identical values get the same
+    canonical id (hash-consing, so there is no collision), which lets the differ know two subtrees are
+    equal without visiting them.
+
+    Args:
+        left: left value
+        right: right value
+        is_tainted: (value, path) => bool; whether custom operators may match the value at this path.
+            None means no operator can match anything.
+        path_registry: if given, paths passed to is_tainted are interned by it as PathNode instead of lists
+    """
+
+    def __init__(self, left, right, is_tainted: Union[Callable[[Any, Union[List, PathNode]], bool], None] = None,
+                 path_registry: Union[PathRegistry, None] = None):
+        self._ids: Dict[Any, int] = {}
+        self._loose_ids: Dict[Any, int] = {}
+
+        self.left: Dict[int, Fingerprint] = {}
+        self.right: Dict[int, Fingerprint] = {}
+
+        root_path = [] if path_registry is None else path_registry.root
+        self._build(left, self.left, is_tainted, root_path)
+        self._build(right, self.right, is_tainted, root_path)
+
+        # ids stay comparable after the tables are released
+        self._ids = {}
+        self._loose_ids = {}
+
+    def _intern(self, key) -> int:
+        return self._ids.setdefault(key, len(self._ids))
+
+    def _intern_loose(self, key) -> int:
+        return self._loose_ids.setdefault(key, len(self._loose_ids))
+
+    def _fingerprint_primitive(self, value, tainted: bool) -> Fingerprint:
+        # nan != nan, so it must never be considered as identical to anything
+        if type(value) == float and math.isnan(value):
+            return Fingerprint(None, None, tainted)
+        try:
+            # 1 == 1.0 == True for compare_primitive, so the loose id does not care about the type
+            return Fingerprint(self._intern((type(value), value)), self._intern_loose(value), tainted)
+        except TypeError:
+            return Fingerprint(None, None, tainted)
+
+    def _build(self, root, table: Dict[int, Fingerprint], is_tainted, root_path: Union[List, PathNode]):
+        """Iterative post-order traversal so that deep documents will not hit the recursion limit
+
+        """
+        stack = [(root, root_path, False)]
+        results: List[Fingerprint] = []
+
+        while len(stack) > 0:
+            value, path, expanded = stack.pop()
+            value_type = type(value)
+
+            if value_type != dict and value_type != list and value_type != tuple:
+                tainted = is_tainted is not None and is_tainted(value, path)
+                results.append(self._fingerprint_primitive(value, tainted))
+                continue
+
+            sortable = True
+            if value_type == dict:
+                try:
+                    keys = sorted(value.keys())
+                except TypeError:
+                    keys = list(value.keys())
+                    sortable = False
+            else:
+                keys = range(len(value))
+
+            if not expanded:
+                stack.append((value, path, True))
+                for k in reversed(keys):
+                    if is_tainted is None:
+                        child_path = path
+                    elif type(path) == list:
+                        child_path = [*path, k]
+                    else:
+                        child_path = path.child(k)
+                    stack.append((value[k], child_path, False))
+                continue
+
+            children = results[len(results) - len(keys):] if len(keys) > 0 else []
+            del results[len(results) - len(keys):]
+
+            tainted = is_tainted is not None and is_tainted(value, path)
+            strict = None
+            if all(c.strict is not None for c in children):
+                if value_type == dict:
+                    strict = self._intern((dict, tuple(zip(keys, [c.strict for c in children]))))
+                else:
+                    # a tuple is diffed as an array
+                    strict = self._intern((list, tuple([c.strict for c in children])))
+
+            loose = None
+            if sortable and all(c.loose is not None for c in children):
+                if value_type == dict:
+                    loose = self._intern_loose((dict, tuple(zip(keys, [c.loose for c in children]))))
+                else:
+                    # an array may be compared without order
+                    loose = self._intern_loose((list, tuple(sorted([c.loose for c in children]))))
+            tainted = tainted or any(c.tainted for c in children)
+
+            if id(value) in table:
+                # the same object shows up at several paths
+                tainted = tainted or table[id(value)].tainted
+            fingerprint = Fingerprint(strict, loose, tainted)
+            table[id(value)] = fingerprint
+            results.append(fingerprint)
+
+    def is_tainted(self, left, right) -> bool:
+        """Whether a custom operator may match left, right or anything below them
+
+        Args:
+            left: a container from the left json
+            right: a container from the right json
+
+        Returns:
+            True if any side may be matched by an operator or is unknown to this index
+        """
+        left_fingerprint = self.left.get(id(left))
+        right_fingerprint = self.right.get(id(right))
+        if left_fingerprint is None or right_fingerprint is None:
+            return True
+        return left_fingerprint.tainted or right_fingerprint.tainted
+
+    def element_keys(self, value, side: Dict[int, Fingerprint]) -> Tuple[Any, Any]:
+        """Get hashable keys of an item inside an indexed container
+
+        Args:
+            value: the item
+            side: self.left or self.right
+
+        Returns:
+            The strict key and the loose key of the item; None if unknown.
+            Items with the same strict key are identical, items with different loose keys are never diffed to 1.
+        """
+        value_type = type(value)
+        if value_type == dict or value_type == list or value_type == tuple:
+            fingerprint = side.get(id(value))
+            if fingerprint is None:
+                return None, None
+            return (
+                None if fingerprint.strict is None else ("#", fingerprint.strict),
+                None if fingerprint.loose is None else ("#", fingerprint.loose)
+            )
+
+        if value_type == float and math.isnan(value):
+            return None, None
+        try:
+            hash(value)
+        except TypeError:
+            return None, None
+        return (value_type, value), ("=", value)
+
+    def content_ids(self, left, right) -> Union[Tuple[int, int], None]:
+        """Canonical ids of two containers that no custom operator can touch
+
+        Containers of the same content have the same id wherever they are, on either side.
+
+        Args:
+            left: a value from the left json
+            right: a value from the right json
+
+        Returns:
+            (left id, right id) or None if any side is a primitive value, unknown, tainted or not hashable
+        """
+        left_fingerprint = self.left.get(id(left))
+        right_fingerprint = self.right.get(id(right))
+        if left_fingerprint is None or right_fingerprint is None:
+            return None
+        if left_fingerprint.tainted or right_fingerprint.tainted:
+            return None
+        if left_fingerprint.strict is None or right_fingerprint.strict is None:
+            return None
+        return left_fingerprint.strict, right_fingerprint.strict
+
+    def is_distinct(self, left, right) -> bool:
+        """Whether left and right are containers that no custom operator can touch and can never be diffed to 1
+
+        Args:
+            left: a value from the left json
+            right: a value from the right json
+
+        Returns:
+            True only if the loose ids of left and right are known to be different
+        """
+        left_type = type(left)
+        if left_type != dict and left_type != list and left_type != tuple:
+            return False
+
+        left_fingerprint = self.left.get(id(left))
+        right_fingerprint = self.right.get(id(right))
+        if left_fingerprint is None or right_fingerprint is None:
+            return False
+
+        if left_fingerprint.tainted or right_fingerprint.tainted:
+            return False
+
+        return left_fingerprint.loose is not None and right_fingerprint.loose is not None and \
+            left_fingerprint.loose != right_fingerprint.loose
+
+    def is_identical(self, left, right) -> bool:
+        """Whether left and right are structurally identical containers that no custom operator can touch
+
+        Args:
+            left: a value from the left json
+            right: a value from the right json
+
+        Returns:
+            True only if the diff of left and right is known to be 1 without visiting them
+        """
+        left_type = type(left)
+        if left_type != dict and left_type != list and left_type != tuple:
+            return False
+
+        left_fingerprint = self.left.get(id(left))
+        right_fingerprint = self.right.get(id(right))
+        if left_fingerprint is None or right_fingerprint is None:
+            return False
+
+        if left_fingerprint.tainted or right_fingerprint.tainted:
+            return False
+
+        return left_fingerprint.strict is not None and left_fingerprint.strict == right_fingerprint.strict
@@ -2,28 +2,229 @@ import json
 import os
 import re
 import shutil
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Any, Dict, List, Pattern, Union
+
+from jycm.common import PLACE_HOLDER_NON_EXIST, VALUE_REF
 
 if TYPE_CHECKING:
     from jycm.jycm import TreeLevel
 
 
-def make_ignore_order_func(ignore_order_path_regex_list):
-    ignore_order_matcher_list = [re.compile(p) for p in ignore_order_path_regex_list]
+# escapes of a character class; they may match digits
+_CLASS_ESCAPES = set("dwsDWS")
+# escapes of a single character or an anchor
+_LITERAL_ESCAPES = set("AZntrfv")
+# backreferences are renumbered and inline flags apply to the whole pattern once combined
+_NOT_COMBINABLE = re.compile(r"\\\d|\(\?P=|\(\?[aiLmsux]")
+
+
+def is_index_agnostic(pattern: str) -> bool:
+    """Whether a path regex can not tell array indices apart
+
+    This is a conservative syntactic check: anything that may match digits is either repeated by `*` or is `\\d+` /
+    `\\d*` between `\\[` and `\\]`, and there are no literal digits, counted repetitions, backreferences or word
+    boundaries. For such a regex "a->[17]" matches if and only if "a->[0]" matches.
+
+    Args:
+        pattern: the regex
 
-    def ignore_order_func(level: 'TreeLevel', drill: bool):
-        for matcher in ignore_order_matcher_list:
-            if re.search(matcher, level.get_path()) is not None:
-                return True
+    Returns:
+        True if every index can be replaced by 0 before matching
+    """
+    if any(c.isdigit() for c in pattern) or "(?P=" in pattern or "(?(" in pattern:
         return False
 
-    return ignore_order_func
+    i, size = 0, len(pattern)
+    while i < size:
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= size:
+                return False
+            escaped = pattern[i + 1]
+            if not escaped.isalnum() or escaped in _LITERAL_ESCAPES:
+                i += 2
+                continue
+            if escaped not in _CLASS_ESCAPES:
+                return False
+            atom_start, i = i, i + 2
+        elif c == "[":
+            atom_start = i
+            i += 1
+            if i < size and pattern[i] == "^":
+                i += 1
+            if i < size and pattern[i] == "]":
+                i += 1
+            while i < size and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            if i >= size:
+                return False
+            i += 1
+        elif c == ".":
+            atom_start, i = i, i + 1
+        else:
+            i += 1
+            continue
+
+        # an atom which may match digits
+        quantifier = pattern[i] if i < size else ""
+        if quantifier == "*":
+            i += 1
+            continue
+        if quantifier == "+" and pattern[atom_start:i] == "\\d" and pattern[atom_start - 2:atom_start] == "\\[" and \
+                pattern[i + 1:i + 3] == "\\]":
+            i += 1
+            continue
+        return False
+
+    return True
+
+
+def combine_regexes(regexes: List[Pattern]) -> Union[Pattern, None]:
+    """Combine regexes into one alternation which matches if any of them matches
+
+    Args:
+        regexes: compiled regexes without flags
+
+    Returns:
+        The combined regex or None if they can not be combined
+    """
+    if any(regex.flags != re.compile("").flags or _NOT_COMBINABLE.search(regex.pattern) for regex in regexes):
+        return None
+    try:
+        return re.compile("|".join(f"(?:{regex.pattern})" for regex in regexes))
+    except re.error:
+        return None
+
+
+class IgnoreOrderFunc:
+    """Decide whether arrays are compared without order by regexes of their paths
+
+    The regexes are combined into one alternation. If no regex can tell array indices apart (see is_index_agnostic),
+    decisions are memoized per path with every index replaced by 0, so arrays inside arrays share one decision and
+    the memo only grows with the shapes of paths. Otherwise every path is searched, as a memo per path would grow
+    with the number of arrays. Instances are picklable.
+
+    Args:
+        ignore_order_path_regex_list: list of path regexes of arrays without order
+    """
+
+    def __init__(self, ignore_order_path_regex_list: List[str]):
+        self.patterns = [*ignore_order_path_regex_list]
+        self.regexes = [re.compile(p) for p in self.patterns]
+        self.combined = combine_regexes(self.regexes) if len(self.regexes) > 1 else None
+        self.index_agnostic = all(is_index_agnostic(regex.pattern) for regex in self.regexes)
+
+        self.decisions: Dict[tuple, bool] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _search(self, path_key: str) -> bool:
+        if self.combined is not None:
+            return self.combined.search(path_key) is not None
+        return any(regex.search(path_key) is not None for regex in self.regexes)
+
+    def __call__(self, level: 'TreeLevel', drill: bool) -> bool:
+        # the same path as TreeLevel.get_path
+        path = level.left_path if level.left != PLACE_HOLDER_NON_EXIST else level.right_path
+        if not self.index_agnostic:
+            return self._search(make_json_path_key(path))
+
+        key = tuple([0 if type(segment) == int else segment for segment in path])
+        decision = self.decisions.get(key)
+        if decision is None:
+            self.misses += 1
+            decision = self._search(make_json_path_key(list(key)))
+            self.decisions[key] = decision
+        else:
+            self.hits += 1
+        return decision
+
+    def stats(self) -> Dict[str, int]:
+        """Get counters of memoized decisions
+
+        Returns:
+            A dict of hits, misses and size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.decisions)
+        }
+
+
+def make_ignore_order_func(ignore_order_path_regex_list: List[str]) -> IgnoreOrderFunc:
+    return IgnoreOrderFunc(ignore_order_path_regex_list)
 
 
 def make_json_path_key(path_list: List[str]):
     return "->".join([f"[{v}]" if isinstance(v, int) else v for v in path_list])
 
 
+def make_value_ref(value, side: str, path: List, max_size: int, preview_size=64) -> Union[Any, dict]:
+    """Keep a value if it is short as json, otherwise reference it by path
+
+    The value is only encoded until it is known to be longer than max_size and the preview is filled,
+    so big subtrees cost O(max_size + preview_size).
+    A short value of the shape of a reference (see is_value_ref) is referenced as well, so resolve_value_ref
+    always gives back the value.
+
+    Args:
+        value: a value from the left or right json
+        side: "left" or "right"
+        path: the path of the value
+        max_size: max length of the value as json
+        preview_size: length of the json kept as preview for a referenced value
+
+    Returns:
+        The value itself or {VALUE_REF: side, "path": path, "preview": the beginning of the json}
+    """
+    if type(value) == str and value == PLACE_HOLDER_NON_EXIST:
+        return value
+
+    chunks, size = [], 0
+    for chunk in json.JSONEncoder(default=repr).iterencode(value):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_size and size >= preview_size:
+            break
+
+    if size <= max_size and not is_value_ref(value):
+        return value
+    return {
+        VALUE_REF: side,
+        "path": [*path],
+        "preview": "".join(chunks)[:preview_size] + "..."
+    }
+
+
+def is_value_ref(value) -> bool:
+    """Whether a value is a reference made by make_value_ref
+
+    A value of the json may have the key VALUE_REF as well, so only the exact shape counts.
+    """
+    return type(value) == dict and value.keys() == {VALUE_REF, "path", "preview"} and \
+        value[VALUE_REF] in ("left", "right") and type(value["path"]) == list and type(value["preview"]) == str
+
+
+def resolve_value_ref(left, right, value):
+    """Resolve a value made by make_value_ref
+
+    Args:
+        left: the left json
+        right: the right json
+        value: a value from Record.to_dict
+
+    Returns:
+        The referenced value; the value itself if it is not of the shape made by make_value_ref
+    """
+    if not is_value_ref(value):
+        return value
+    resolved = left if value[VALUE_REF] == "left" else right
+    for k in value["path"]:
+        resolved = resolved[k]
+    return resolved
+
+
 HTML_TEMPLATE = """
 <!doctype html>
 <html lang="en">
@@ -1,41 +1,94 @@
-from typing import Callable, Dict, List, Tuple, Union
+import functools
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generator, Hashable, Iterable, Iterator, List, Set, Tuple, Union
 
+import numpy as np
+
+from jycm.cache import ScoreCache
 from jycm.common import (EVENT_DICT_ADD, EVENT_DICT_REMOVE, EVENT_LIST_ADD, EVENT_LIST_REMOVE, EVENT_PAIR,
                          EVENT_VALUE_CHANGE, PLACE_HOLDER_NON_EXIST)
-from jycm.helper import make_json_path_key
-from jycm.km_matcher import KMMatcher
+from jycm.dispatcher import OperatorDispatcher
+from jycm.fingerprint import FingerprintIndex
+from jycm.helper import IgnoreOrderFunc, make_json_path_key, make_value_ref, resolve_value_ref
+from jycm.km_matcher import ASSIGNMENT_ENGINE_KM, ASSIGNMENT_ENGINES, MATCHERS, ComponentMatcher
+from jycm.lcs import myers_lcs
+from jycm.lsh import MinHashLSH
 from jycm.operator import BaseOperator
+from jycm.parallel import ProcessPoolDiffExecutor, count_values, pack_record, unpack_value
+from jycm.path import PathNode, PathRegistry, StructuralPaths
+from jycm.sink import CallbackRecordSink, MemoryRecordSink, QueueRecordSink, RecordSink
 
 
 class TreeLevel:
     """The base data structure for diffing.
 
+    Levels created by the differ only carry interned paths (a parent pointer plus the last segment);
+    left_path and right_path are materialized as lists on first access.
+
     Args:
         left: left value
         right: right value
-        left_path: left json path
-        right_path: right json path
+        left_path: left json path; may be omitted if left_path_node is given
+        right_path: right json path; may be omitted if right_path_node is given
         up: the parent TreeLevel
         diff: a simple way to inject custom operators ; default None
+        left_path_node: interned left_path; filled by the differ if None
+        right_path_node: interned right_path; filled by the differ if None
     """
+    __slots__ = ("left", "right", "_left_path", "_right_path", "left_path_node", "right_path_node", "up", "_diff")
 
-    def __init__(self, left, right, left_path: List, right_path: List, up: Union['TreeLevel', None],
-                 diff: Union[Callable[['TreeLevel', bool], Tuple[bool, float]], None] = None):
+    def __init__(self, left, right, left_path: Union[List, None] = None, right_path: Union[List, None] = None,
+                 up: Union['TreeLevel', None] = None,
+                 diff: Union[Callable[['TreeLevel', bool], Tuple[bool, float]], None] = None,
+                 left_path_node: Union[PathNode, None] = None, right_path_node: Union[PathNode, None] = None):
         """Init method for TreeLevel
 
         """
+        if left_path is None and left_path_node is None or right_path is None and right_path_node is None:
+            raise ValueError("either a path or an interned path is required for both sides")
+
         self.left = left
         self.right = right
 
-        self.left_path: List = left_path
-        self.right_path: List = right_path
+        self._left_path: Union[List, None] = left_path
+        self._right_path: Union[List, None] = right_path
+
+        self.left_path_node: Union[PathNode, None] = left_path_node
+        self.right_path_node: Union[PathNode, None] = right_path_node
 
         self.up: TreeLevel = up
 
-        if diff is not None:
-            self.diff = lambda _drill: diff(self, _drill)
-        else:
-            self.diff = None
+        self._diff = diff
+
+    @property
+    def left_path(self) -> List:
+        if self._left_path is None:
+            self._left_path = self.left_path_node.to_list()
+        return self._left_path
+
+    @left_path.setter
+    def left_path(self, left_path: List):
+        self._left_path = left_path
+        self.left_path_node = None
+
+    @property
+    def right_path(self) -> List:
+        if self._right_path is None:
+            self._right_path = self.right_path_node.to_list()
+        return self._right_path
+
+    @right_path.setter
+    def right_path(self, right_path: List):
+        self._right_path = right_path
+        self.right_path_node = None
+
+    @property
+    def diff(self) -> Union[Callable[[bool], Tuple[bool, float]], None]:
+        if self._diff is None:
+            return None
+        return functools.partial(self._diff, self)
 
     def get_type(self) -> type:
         """Get the type of this level
@@ -97,8 +150,24 @@ class DifferentTypeException(Exception):
 class DiffLevelException(Exception):
     """The exception that will be threw from _diff function.
 
+    The message is formatted on demand since it stringifies the whole level.
+
+    Args:
+        error: the original exception
+        level: the tree level being diffed
+        drill: whether the diff was in drill mode
     """
-    pass
+
+    def __init__(self, error, level: Union[TreeLevel, None] = None, drill: bool = False):
+        super().__init__(error)
+        self.error = error
+        self.level = level
+        self.drill = drill
+
+    def __str__(self):
+        if self.level is None:
+            return str(self.error)
+        return f"Error {self.error} [drill={self.drill}] when compare [{self.level}]"
 
 
 class Record:
@@ -115,17 +184,38 @@ class Record:
         self.level = level
         self.info = info
 
-    def to_dict(self):
+    def to_dict(self, max_value_size: Union[int, None] = None, preview_size=64):
         """Convert to dict
 
+        Args:
+            max_value_size: values (left, right, old and new) longer than this as json are referenced by path
+                with a preview instead of being copied; see helper.make_value_ref and helper.resolve_value_ref.
+                None to keep all values.
+            preview_size: length of the preview of a referenced value
+
         Returns:
             A dict
         """
+        if max_value_size is None:
+            return {
+                **self.level.to_dict(),
+                "left_path": make_json_path_key(self.level.left_path),
+                "right_path": make_json_path_key(self.level.right_path),
+                **self.info
+            }
+
+        left_path, right_path = self.level.left_path, self.level.right_path
+        info = {**self.info}
+        for key, side, path in [("old", "left", left_path), ("new", "right", right_path)]:
+            if key in info:
+                info[key] = make_value_ref(info[key], side, path, max_value_size, preview_size)
+
         return {
-            **self.level.to_dict(),
-            "left_path": make_json_path_key(self.level.left_path),
-            "right_path": make_json_path_key(self.level.right_path),
-            **self.info
+            "left": make_value_ref(self.level.left, "left", left_path, max_value_size, preview_size),
+            "right": make_value_ref(self.level.right, "right", right_path, max_value_size, preview_size),
+            "left_path": make_json_path_key(left_path),
+            "right_path": make_json_path_key(right_path),
+            **info
         }
 
 
@@ -158,17 +248,382 @@ def gather_serial_pair(target_index, indices, list_, container):
 class ListItemPair:
     """Pair of array items
 
+    Args:
+        value: the tree level of the pair; None to create it from score_matrix on first access
+        left_index: index of the left item
+        right_index: index of the right item
+        score_matrix: the ListScoreMatrix of the arrays
     """
 
-    def __init__(self, value: TreeLevel, left_index, right_index):
-        self.level: TreeLevel = value
+    def __init__(self, value: Union[TreeLevel, None], left_index, right_index,
+                 score_matrix: Union['ListScoreMatrix', None] = None):
+        self._level: Union[TreeLevel, None] = value
         self.left_index = left_index
         self.right_index = right_index
+        self.score_matrix = score_matrix
+
+    @property
+    def level(self) -> TreeLevel:
+        if self._level is None:
+            self._level = self.score_matrix.item_level(self.left_index, self.right_index)
+        return self._level
 
     def __repr__(self):  # pragma: no cover
         return f"<left_index=[{self.left_index}],right_index=[{self.right_index}],level=[{self.level}]>"
 
 
+class ListScoreMatrix:
+    """Drill scores between items of two arrays
+
+    Every pair of items is scored at most once and the scores are shared by all phases of diffing the arrays:
+    LCS table, backtracking, fuzzy matching and matching without order.
+    Items are mapped to canonical hash ids first so that many pairs can be decided without diffing.
+
+    Args:
+        differ: the differ
+        level: the tree level of the two arrays
+    """
+
+    def __init__(self, differ: 'YouchamaJsonDiffer', level: TreeLevel):
+        self.differ = differ
+        self.level = level
+        self.left_size, self.right_size = len(level.left), len(level.right)
+        self.left_path_node, self.right_path_node = differ.get_path_nodes(level)
+
+        self.scores: Dict[Tuple[int, int], float] = {}
+        # pairs known to be diffed to less than 1 without their scores
+        self._unequal: Set[Tuple[int, int]] = set()
+
+        self.item_ids = self._build_item_ids()
+        if self.item_ids is not None:
+            self._left_strict, self._left_loose, self._left_unknown, \
+                self._right_strict, self._right_loose, self._right_unknown = [ids.tolist() for ids in self.item_ids]
+
+        # loose id => right indices in ascending order, and how many of them at the front are matched already
+        self._right_buckets: Union[Dict[int, List[int]], None] = None
+        self._bucket_offsets: Dict[Hashable, int] = {}
+
+        # (operator index, join key) of every left item or None, and the same => right indices
+        self._left_join_keys: Union[List[Union[Tuple[int, Hashable], None]], None] = None
+        self._right_join_buckets: Dict[int, Union[Dict[Hashable, List[int]], None]] = {}
+
+    def _build_item_ids(self) -> Union[Tuple[np.ndarray, ...], None]:
+        """Map every item of level.left and level.right to canonical hash ids.
+
+        Returns:
+            (left_strict, left_loose, left_unknown, right_strict, right_loose, right_unknown) or None if
+            custom operators may match the items.
+            Items with the same strict id are diffed to 1, items with different loose ids are never diffed to 1
+            unless their loose ids are unknown.
+        """
+        index = self.differ.fingerprint_index
+        if index is None or index.is_tainted(self.level.left, self.level.right):
+            return None
+
+        key_ids = {}
+
+        def __to_ids(values, side, unknown_id):
+            strict_ids = np.empty(len(values), dtype=np.int64)
+            loose_ids = np.empty(len(values), dtype=np.int64)
+            loose_unknown = np.zeros(len(values), dtype=bool)
+            for i, v in enumerate(values):
+                strict_key, loose_key = index.element_keys(v, side)
+                # unknown strict keys are never equal to anything
+                strict_ids[i] = unknown_id(i) if strict_key is None else key_ids.setdefault(strict_key, len(key_ids))
+                if loose_key is None:
+                    loose_unknown[i] = True
+                    loose_ids[i] = -1
+                else:
+                    loose_ids[i] = key_ids.setdefault(loose_key, len(key_ids))
+            return strict_ids, loose_ids, loose_unknown
+
+        return (
+            *__to_ids(self.level.left, index.left, lambda i: -2 * i - 1),
+            *__to_ids(self.level.right, index.right, lambda i: -2 * i - 2)
+        )
+
+    def score(self, left_index: int, right_index: int) -> float:
+        """Drill score of level.left[left_index] and level.right[right_index]
+
+        """
+        key = (left_index, right_index)
+        score = self.scores.get(key)
+        if score is not None:
+            return score
+
+        if self.item_ids is not None and self._left_strict[left_index] == self._right_strict[right_index]:
+            score = 1
+        else:
+            score = self.differ.score(
+                self.level.left[left_index], self.level.right[right_index],
+                self.left_path_node.child(left_index), self.right_path_node.child(right_index), up=self.level
+            )
+        self.scores[key] = score
+        return score
+
+    def item_level(self, left_index: int, right_index: int) -> TreeLevel:
+        """Tree level of level.left[left_index] and level.right[right_index]
+
+        """
+        return TreeLevel(
+            left=self.level.left[left_index],
+            right=self.level.right[right_index],
+            up=self.level,
+            left_path_node=self.left_path_node.child(left_index),
+            right_path_node=self.right_path_node.child(right_index)
+        )
+
+    def is_equal(self, left_index: int, right_index: int) -> bool:
+        """Whether level.left[left_index] and level.right[right_index] are diffed to 1
+
+        """
+        if self.item_ids is not None:
+            if self._left_strict[left_index] == self._right_strict[right_index]:
+                return True
+            if not self._left_unknown[left_index] and not self._right_unknown[right_index] and \
+                    self._left_loose[left_index] != self._right_loose[right_index]:
+                return False
+        return self._is_exact(left_index, right_index)
+
+    def _is_exact(self, left_index: int, right_index: int) -> bool:
+        key = (left_index, right_index)
+        score = self.scores.get(key)
+        if score is not None:
+            return score == 1
+        if key in self._unequal:
+            return False
+
+        exact = self.differ.is_exact(
+            self.level.left[left_index], self.level.right[right_index],
+            self.left_path_node.child(left_index), self.right_path_node.child(right_index), up=self.level
+        )
+        if exact:
+            self.scores[key] = 1
+        else:
+            self._unequal.add(key)
+        return exact
+
+    def _build_right_buckets(self) -> Dict[int, List[int]]:
+        right_buckets = {}
+        for ri, loose_id in enumerate(self._right_loose):
+            if loose_id not in right_buckets:
+                right_buckets[loose_id] = []
+            right_buckets[loose_id].append(ri)
+        return right_buckets
+
+    def _build_left_join_keys(self) -> List[Union[Tuple[int, Hashable], None]]:
+        """Join key of every left item by the operator deciding it
+
+        An item gets a key only if the first operator matching it declares a join key.
+        Operators overriding `match` may match anything, so items behind them get no key.
+
+        """
+        operators = self.differ.custom_operators
+        dispatcher = self.differ.operator_dispatcher
+        # an operator overriding `match` may match anything after the join operator
+        if len(dispatcher.dynamic_indices) > 0 or \
+                not any(self.differ.is_join_operator(operator) for operator in operators):
+            return [None] * self.left_size
+
+        left_path_node, _ = self.differ.get_path_nodes(self.level)
+
+        left_join_keys = []
+        for li, value in enumerate(self.level.left):
+            item_path_node = left_path_node.child(li)
+            indices = dispatcher.match_path(item_path_node)
+            join_key = None
+            if len(indices) == 1 and self.differ.is_join_operator(operators[indices[0]]):
+                key = self._join_key(operators[indices[0]], value, item_path_node)
+                join_key = None if key is None else (indices[0], key)
+            left_join_keys.append(join_key)
+        return left_join_keys
+
+    def _join_key(self, operator: BaseOperator, value, path_node: Union[PathNode, None]) -> Union[Hashable, None]:
+        """Join key of an item, if items with other keys can never be diffed to 1
+
+        Args:
+            operator: the join operator
+            value: the item
+            path_node: the interned path of a left item to make sure no operator matches its key values;
+                None for a right item
+
+        Returns:
+            The key or None
+        """
+        key = operator.join_key(value)
+        paths = operator.join_key_paths()
+        if key is None or paths is None:
+            return key
+
+        differ = self.differ
+        # the item is diffed by compare_dict, a key at a time, and its key values by compare_primitive
+        if type(differ).compare_dict is not YouchamaJsonDiffer.compare_dict or \
+                type(differ).compare_primitive is not YouchamaJsonDiffer.compare_primitive:
+            return None
+        for path in paths:
+            current, current_path_node = value, path_node
+            for k in path:
+                if type(current) != dict or type(current) in differ._handler_types:
+                    return None
+                current = current[k]
+                if current_path_node is not None:
+                    current_path_node = current_path_node.child(k)
+                    if len(differ.operator_dispatcher.match_path(current_path_node)) > 0:
+                        return None
+            if type(current) in (dict, list, tuple) or type(current) in differ._handler_types:
+                return None
+            try:
+                hash(current)
+            except TypeError:
+                return None
+        return key
+
+    def _get_right_join_bucket(self, join_key: Tuple[int, Hashable]) -> Union[List[int], None]:
+        """Right indices of items with a join key
+
+        Returns:
+            The right indices in ascending order, or None if some right item has no join key
+        """
+        k, key = join_key
+        if k not in self._right_join_buckets:
+            operator = self.differ.custom_operators[k]
+            right_buckets = {}
+            for ri, value in enumerate(self.level.right):
+                right_key = self._join_key(operator, value, None)
+                if right_key is None:
+                    right_buckets = None
+                    break
+                if right_key not in right_buckets:
+                    right_buckets[right_key] = []
+                right_buckets[right_key].append(ri)
+            self._right_join_buckets[k] = right_buckets
+        if self._right_join_buckets[k] is None:
+            return None
+        return self._right_join_buckets[k].get(key, [])
+
+    def find_first_equal(self, left_index: int, matched_right: Dict[int, bool]) -> Union[int, None]:
+        """Find the lowest unmatched right index whose item is equal to level.left[left_index]
+
+        Right items are bucketed by loose ids, only the bucket of the left item is visited if ids are known,
+        which makes exact matching of all items O(n+m) in general.
+        Items decided by an operator declaring a join key (see BaseOperator.join_key) are bucketed by join keys instead.
+
+        Args:
+            left_index: index of the left item
+            matched_right: right indices matched already
+
+        Returns:
+            The right index or None if nothing is equal
+        """
+        if self._left_join_keys is None:
+            self._left_join_keys = self._build_left_join_keys()
+
+        if self._right_buckets is None and self.item_ids is not None and not self.item_ids[5].any():
+            self._right_buckets = self._build_right_buckets()
+
+        bucket_key = self._left_join_keys[left_index]
+        candidates = None if bucket_key is None else self._get_right_join_bucket(bucket_key)
+        if candidates is None:
+            bucket_key = None
+            if self._right_buckets is not None and not self._left_unknown[left_index]:
+                bucket_key = self._left_loose[left_index]
+                candidates = self._right_buckets.get(bucket_key, [])
+            else:
+                candidates = range(self.right_size)
+
+        offset = 0
+        if bucket_key is not None:
+            offset = self._bucket_offsets.get(bucket_key, 0)
+            while offset < len(candidates) and candidates[offset] in matched_right:
+                offset += 1
+            self._bucket_offsets[bucket_key] = offset
+
+        for k in range(offset, len(candidates)):
+            ri = candidates[k]
+            if ri in matched_right:
+                continue
+            if self.is_equal(left_index, ri):
+                return ri
+        return None
+
+    def equality_table(self) -> np.ndarray:
+        """Same as is_equal for every pair at once
+
+        Returns:
+            A (left_size, right_size) boolean numpy array
+        """
+        if self.item_ids is None:
+            equal_table = np.zeros((self.left_size, self.right_size), dtype=bool)
+            undecided_table = np.ones((self.left_size, self.right_size), dtype=bool)
+        else:
+            left_strict, left_loose, left_unknown, right_strict, right_loose, right_unknown = self.item_ids
+
+            equal_table = left_strict[:, None] == right_strict[None, :]
+            maybe_equal_table = (left_loose[:, None] == right_loose[None, :]) | left_unknown[:, None] | right_unknown[
+                None, :]
+            undecided_table = maybe_equal_table & ~equal_table
+
+        for i, j in zip(*np.nonzero(undecided_table)):
+            equal_table[i, j] = self._is_exact(int(i), int(j))
+
+        return equal_table
+
+
+LCS_ENGINE_TABLE = "table"
+LCS_ENGINE_VECTORIZED = "vectorized"
+LCS_ENGINE_MYERS = "myers"
+LCS_ENGINES = [LCS_ENGINE_TABLE, LCS_ENGINE_VECTORIZED, LCS_ENGINE_MYERS]
+
+TypeHandler = Callable[['YouchamaJsonDiffer', TreeLevel, bool], float]
+
+# the last element of the cache key of a level known to be diffed to less than 1 in drill mode
+EXACT_PROBE = "exact"
+# the last element of the cache key of how items of two arrays are matched
+LIST_MATCHING = "matching"
+# the kind of matching of arrays without order; arrays with order are matched by their lcs_engine
+LIST_MATCHING_WITHOUT_ORDER = "without_order"
+# matchings of arrays with fewer pairs of items are not cached
+LIST_MATCHING_MIN_PAIRS = 64
+
+# the score of a pair of contents only depends on the contents
+CONTENT_CONTEXT_NONE = "none"
+# ... and on the left path with every index replaced by 0, where ignore_order_func looks at
+CONTENT_CONTEXT_STRUCTURE = "structure"
+# ... and on the left path
+CONTENT_CONTEXT_PATH = "path"
+
+# diff by mutual recursion of diff_level and the compare methods
+TRAVERSAL_ENGINE_RECURSIVE = "recursive"
+# diff with an explicit stack of report steps; see YouchamaJsonDiffer
+TRAVERSAL_ENGINE_STACK = "stack"
+TRAVERSAL_ENGINES = [TRAVERSAL_ENGINE_RECURSIVE, TRAVERSAL_ENGINE_STACK]
+# how many drills the stack engine nests by recursion before a deeper drill is deferred
+DRILL_DEPTH_BUDGET = 32
+
+ListMatching = Tuple
+# how a compare method diffs a level: in the report phase each child level to be diffed is yielded and its score is
+# sent back; in drill mode children are scored in place and nothing is yielded
+CompareSteps = Generator[TreeLevel, float, float]
+
+
+class _DrillDeferred(BaseException):
+    """Unwind a drill nested deeper than DRILL_DEPTH_BUDGET to the outermost drill, which runs it and tries again
+
+    It is not an Exception so that nothing on the way catches it.
+
+    Args:
+        key: the key of the result of the drill
+        compute: the drill
+        args: arguments of compute
+    """
+
+    def __init__(self, key: Tuple, compute: Callable[..., Any], args: Tuple):
+        super().__init__(key)
+        self.key = key
+        self.compute = compute
+        self.args = args
+
+
 class YouchamaJsonDiffer:
     """
         Args:
@@ -179,31 +634,170 @@ class YouchamaJsonDiffer:
                 (level: TreeLevel, drill: boolean) => bool
             debug: set True then some debug info will be collected. default False.
             fast_mode: whether or not using LCS. default True
+            use_cache: whether or not caching the score of each level. default True
+                Or a ScoreCache from jycm.cache to bound the memory of the cache, for example
+                LRUScoreCache(max_entries=1000000), MaxBytesScoreCache(max_bytes=2 ** 30) or DrillOnlyScoreCache().
+            use_fingerprint: whether or not skipping structurally identical subtrees. default True
+            lcs_engine: how the LCS table of arrays with order is built. default "table"
+                "table": diff every pair of items
+                "vectorized": decide equality by fingerprints wherever possible and fill the table with numpy
+                "myers": Myers' O(ND) algorithm in linear space; cost scales with the number of differences.
+                    The LCS found may be a different one of the same length.
+            assignment_engine: how items of arrays without order are matched by similarity. default "km"
+                "km": Kuhn-Munkres (Hungarian) algorithm
+                "lapjv": shortest augmenting path of Jonker-Volgenant, which is much faster on big arrays;
+                    scipy.optimize.linear_sum_assignment is used if installed.
+                    Among equally good matchings the one found may be different.
+            unordered_candidates: only score pairs of items found by this for fuzzy matching of arrays without
+                order, e.g. jycm.lsh.MinHashLSH(). Other pairs are taken as 0. default None to score every pair.
+                Small arrays and arrays custom operators may touch are always scored exhaustively.
+            record_sink: where records go as soon as they are reported; see jycm.sink. default MemoryRecordSink
+                which keeps everything for to_dict. Use CallbackRecordSink or NDJSONRecordSink to stream records
+                of big diffs, or iter_records to consume them as a generator.
+            type_handlers: how a level is compared by (type(left), type(right)); overrides the defaults.
+                (differ: YouchamaJsonDiffer, level: TreeLevel, drill: bool) => float
+                By default dicts are compared by compare_dict, lists and tuples (also with each other) by
+                compare_list, and everything else by compare_primitive, so 1 == 1.0.
+            use_content_cache: whether or not sharing drill scores of the same pair of contents at different paths.
+                default True. Or a ScoreCache like use_cache. Only pairs of dicts / arrays no custom operator may
+                touch are shared, and only if use_fingerprint is on, no type_handlers are given and ignore_order_func
+                is None or made by make_ignore_order_func; see get_content_cache_stats.
+            traversal_engine: how levels are visited. default "recursive"
+                "recursive": diff_level and the compare methods call each other, so documents nested about as
+                    deep as the recursion limit of python can not be diffed.
+                "stack": levels of the report phase are kept on an explicit stack and drills are nested at most
+                    DRILL_DEPTH_BUDGET deep, so documents of any depth are diffed to the same records.
+                    Custom operators, type_handlers and the diff of a TreeLevel are called as they are, so levels
+                    they diff by themselves still nest by recursion.
+            parallel_executor: diff big subtrees under keys of the root dicts and items of arrays compared index
+                by index (fast_mode) in other processes, e.g. jycm.parallel.ProcessPoolDiffExecutor(). default None
+                to diff everything in process. The records are the same and in the same order.
+                Operators, functions and handlers given to the differ must be picklable to be shipped to workers,
+                otherwise everything is diffed in process.
+            split_assignment: match items of arrays without order by solving every connected component of nonzero
+                scores on its own (see jycm.km_matcher.ComponentMatcher), which is much faster on big arrays of
+                mostly different items. default False. Among equally good matchings the one found may be different
+                from that of assignment_engine on the whole table.
     """
 
     def __init__(self, left, right, custom_operators: Union[List[BaseOperator], None] = None,
                  ignore_order_func: Union[Callable[[TreeLevel, bool], bool], None] = None, debug=False,
-                 fast_mode=False, use_cache=True):
+                 fast_mode=False, use_cache: Union[bool, ScoreCache] = True, use_fingerprint=True,
+                 lcs_engine="table", record_sink: Union[RecordSink, None] = None,
+                 assignment_engine=ASSIGNMENT_ENGINE_KM, unordered_candidates: Union[MinHashLSH, None] = None,
+                 type_handlers: Union[Dict[Tuple[type, type], TypeHandler], None] = None,
+                 use_content_cache: Union[bool, ScoreCache] = True, traversal_engine=TRAVERSAL_ENGINE_RECURSIVE,
+                 parallel_executor: Union[ProcessPoolDiffExecutor, None] = None, split_assignment=False):
         self.left = left
         self.right = right
 
+        self.parallel_executor = parallel_executor
+        # to build the same differ in workers of parallel_executor
+        self._worker_options = dict(
+            custom_operators=custom_operators, ignore_order_func=ignore_order_func, fast_mode=fast_mode,
+            use_cache=use_cache, use_fingerprint=use_fingerprint, lcs_engine=lcs_engine,
+            assignment_engine=assignment_engine, unordered_candidates=unordered_candidates,
+            type_handlers=type_handlers, use_content_cache=use_content_cache, traversal_engine=traversal_engine,
+            split_assignment=split_assignment
+        )
+
         if custom_operators is None:
             custom_operators = []
         self.custom_operators: List[BaseOperator] = custom_operators
+        self.operator_dispatcher = OperatorDispatcher(custom_operators)
 
-        self.records: Dict[str, List[Record]] = {
-            EVENT_PAIR: []
-        }
+        if record_sink is None:
+            record_sink = MemoryRecordSink()
+        self.record_sink: RecordSink = record_sink
 
-        self.cache = {}
+        self.cache: Union[ScoreCache, None] = None
+        if isinstance(use_cache, ScoreCache):
+            self.cache = use_cache
+        elif use_cache:
+            self.cache = ScoreCache()
         self.key_ctr = {}
 
-        self.use_cache = use_cache
+        self.use_cache = self.cache is not None
+
+        self.content_cache: Union[ScoreCache, None] = None
+        if isinstance(use_content_cache, ScoreCache):
+            self.content_cache = use_content_cache
+        elif use_content_cache:
+            self.content_cache = ScoreCache()
         self.fast_mode = fast_mode
         self.debug = debug
 
+        self.use_fingerprint = use_fingerprint
+        self.fingerprint_index: Union[FingerprintIndex, None] = None
+
+        if lcs_engine not in LCS_ENGINES:
+            raise ValueError(f"unknown lcs_engine=[{lcs_engine}], should be one of {LCS_ENGINES}")
+        self.lcs_engine = lcs_engine
+
+        if assignment_engine not in ASSIGNMENT_ENGINES:
+            raise ValueError(f"unknown assignment_engine=[{assignment_engine}], should be one of {ASSIGNMENT_ENGINES}")
+        self.assignment_engine = assignment_engine
+        self.split_assignment = split_assignment
+
+        self.unordered_candidates = unordered_candidates
+
+        if traversal_engine not in TRAVERSAL_ENGINES:
+            raise ValueError(f"unknown traversal_engine=[{traversal_engine}], should be one of {TRAVERSAL_ENGINES}")
+        self.traversal_engine = traversal_engine
+        # results of drills of the stack engine by (left id, right id, kind) until the outermost drill is done
+        self._drill_results: Union[Dict[Tuple, Any], None] = None
+        if traversal_engine == TRAVERSAL_ENGINE_STACK:
+            self._drill_results = {}
+        self._drill_depth = 0
+
         self.lcs_table_cache = {}
 
+        self.type_handlers: Dict[Tuple[type, type], Callable[[TreeLevel, bool], float]] = {
+            (dict, dict): self.compare_dict,
+            (list, list): self.compare_list,
+            (tuple, tuple): self.compare_list,
+            (list, tuple): self.compare_list,
+            (tuple, list): self.compare_list,
+            # numbers are equal by value
+            (int, float): self.compare_primitive,
+            (float, int): self.compare_primitive,
+        }
+        for type_pair, handler in (type_handlers or {}).items():
+            self.type_handlers[type_pair] = functools.partial(handler, self)
+        # values of these types are never skipped by fingerprints, as handlers given may diff them as they like
+        self._handler_types = frozenset(t for type_pair in (type_handlers or {}) for t in type_pair)
+        # levels of other pairs of types are leaves
+        self._structured_type_pairs = frozenset(
+            type_pair for type_pair, handler in self.type_handlers.items() if handler != self.compare_primitive
+        )
+        # report steps of the compare methods a subclass does not override, which the stack engine can suspend
+        self._report_steps: Dict[Callable, Callable[..., CompareSteps]] = {}
+        for name, steps in [("compare_dict", self._compare_dict_steps), ("compare_list", self._compare_list_steps),
+                            ("compare_list_with_order", self._compare_list_with_order_steps),
+                            ("compare_list_without_order", self._compare_list_without_order_steps)]:
+            if getattr(type(self), name) is getattr(YouchamaJsonDiffer, name):
+                self._report_steps[getattr(self, name)] = steps
+        # fingerprints and the early exits of _is_exact follow the compare methods of this class
+        self._compare_overridden = any(
+            getattr(type(self), name) is not getattr(YouchamaJsonDiffer, name)
+            for name in ["compare_dict", "compare_list", "compare_list_with_order", "compare_list_without_order",
+                         "compare_primitive"]
+        )
+
+        # what the score of a pair of contents depends on besides the contents; see _get_content_key
+        self._content_context: Union[str, None] = None
+        if type_handlers is not None:
+            self.content_cache = None
+        elif ignore_order_func is None:
+            self._content_context = CONTENT_CONTEXT_NONE
+        elif isinstance(ignore_order_func, IgnoreOrderFunc):
+            self._content_context = CONTENT_CONTEXT_STRUCTURE if ignore_order_func.index_agnostic else \
+                CONTENT_CONTEXT_PATH
+        else:
+            # nobody knows what a custom function looks at
+            self.content_cache = None
+        self._structural_paths = StructuralPaths()
+
         if ignore_order_func is None:
             def __ignore_order_func(__level: TreeLevel, __drill: bool):
                 return False
@@ -212,7 +806,26 @@ class YouchamaJsonDiffer:
 
         self.ignore_order_func: Callable[[TreeLevel, bool], bool] = ignore_order_func
 
-        self.event_pair_dict: Dict[str, bool] = {}
+        self.path_registry = PathRegistry()
+
+        self.event_pair_dict: Dict[Tuple[int, int], bool] = {}
+
+    def get_path_nodes(self, level: TreeLevel) -> Tuple[PathNode, PathNode]:
+        """Get the interned left path and right path of a level
+
+        Levels created by the differ carry their nodes already; others are interned here once.
+
+        Args:
+            level: TreeLevel
+
+        Returns:
+            (left_path_node, right_path_node)
+        """
+        if level.left_path_node is None:
+            level.left_path_node = self.path_registry.from_list(level.left_path)
+        if level.right_path_node is None:
+            level.right_path_node = self.path_registry.from_list(level.right_path)
+        return level.left_path_node, level.right_path_node
 
     def report_pair(self, level: TreeLevel):
         """Report pair of json path
@@ -223,17 +836,52 @@ class YouchamaJsonDiffer:
             level: TreeLevel
 
         """
-        left_key = make_json_path_key(level.left_path)
-        right_key = make_json_path_key(level.right_path)
-        unique_key = f"{left_key}__@__{right_key}"
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        unique_key = (left_path_node.id, right_path_node.id)
 
-        if left_key != right_key and unique_key not in self.event_pair_dict:
+        if left_path_node is not right_path_node and unique_key not in self.event_pair_dict:
             self.event_pair_dict[unique_key] = True
 
-            self.records[EVENT_PAIR].append(Record(
+            self.record_sink.emit(Record(
                 event=EVENT_PAIR, level=level, info={}
             ))
 
+    def _report_identical_pairs(self, level: TreeLevel):
+        """Report pairs of json path for a structurally identical level
+
+        Walk the level in the same order as the differ would so that the pairs are the same as a full diff.
+        Nothing below can be reported if left path and right path are the same.
+
+        Args:
+            level: TreeLevel whose left and right are identical
+
+        """
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        if left_path_node is right_path_node:
+            return
+
+        stack = [level]
+        while len(stack) > 0:
+            current = stack.pop()
+            self.report_pair(current)
+
+            level_type = type(current.left)
+            if level_type == dict:
+                keys = sorted(current.left.keys())
+            elif level_type == list or level_type == tuple:
+                keys = range(len(current.left))
+            else:
+                continue
+
+            for k in reversed(keys):
+                stack.append(TreeLevel(
+                    left=current.left[k],
+                    right=current.right[k],
+                    up=current,
+                    left_path_node=current.left_path_node.child(k),
+                    right_path_node=current.right_path_node.child(k)
+                ))
+
     def report(self, event: str, level: TreeLevel, info: Union[Dict, None] = None):
         """Report any useful info
 
@@ -242,79 +890,110 @@ class YouchamaJsonDiffer:
             level: where the info and event are described for
             info:  the additional info attached to the event
         """
-        if event not in self.records:
-            self.records[event] = []
-        self.records[event].append(Record(
+        self.record_sink.emit(Record(
             event=event, level=level, info=info if info is not None else {}
         ))
 
-    def to_dict(self, no_pairs=False) -> dict:
+    @property
+    def records(self) -> Dict[str, List[Record]]:
+        """Records kept in memory grouped by event; empty if they are streamed by another sink
+
+        """
+        if isinstance(self.record_sink, MemoryRecordSink):
+            return self.record_sink.records
+        return {}
+
+    def to_dict(self, no_pairs=False, max_value_size: Union[int, None] = None) -> dict:
         """Convert this to a dict
 
         Normally to_dict is enough to collect all the info.
+        Only records kept by the record sink are included, i.e. nothing if they are streamed.
 
         Args:
             no_pairs: boolean to decide whether to report pairs of json path
+            max_value_size: values longer than this as json are referenced by path instead of being copied;
+                use resolve_value to get them back. None to keep all values.
 
         Returns:
             a dict
         """
-        total_dict = {}
-        events = list(self.records.keys())
-        events.sort()
-        for event in events:
-            records = self.records[event]
-            total_dict[event] = [r.to_dict() for r in records]
+        return self.record_sink.to_dict(no_pairs, max_value_size)
 
-        if no_pairs and EVENT_PAIR in total_dict:
-            del total_dict[EVENT_PAIR]
+    def resolve_value(self, value):
+        """Resolve a value referenced by path in to_dict(max_value_size=...)
 
-        return total_dict
+        Args:
+            value: a value of a record
+
+        Returns:
+            The referenced value; the value itself if it is not a reference
+        """
+        return resolve_value_ref(self.left, self.right, value)
 
-    def _generate_lcs_pair_list(self, level: TreeLevel, left_size: int, right_size: int, dp_table):
+    def iter_records(self, no_pairs=False, max_queue_size=1024) -> Iterator[Record]:
+        """Diff in a background thread and yield records as they are reported
+
+        The diff waits whenever max_queue_size records are not consumed yet. Stopping the iteration aborts the diff.
+        The record sink of the differ is restored once the iteration is over.
+
+        Args:
+            no_pairs: boolean to decide whether to report pairs of json path
+            max_queue_size: max number of records waiting to be consumed
+
+        Returns:
+            A generator of records
+        """
+        sink = QueueRecordSink(max_size=max_queue_size, no_pairs=no_pairs)
+        previous_sink, self.record_sink = self.record_sink, sink
+
+        thread = threading.Thread(target=sink.produce, args=(self.diff,), daemon=True)
+        thread.start()
+        try:
+            yield from sink
+        finally:
+            sink.close()
+            thread.join()
+            self.record_sink = previous_sink
+
+    def _generate_lcs_pair_list(self, level: TreeLevel, left_size: int, right_size: int, dp_table, equal_table,
+                                score_matrix: ListScoreMatrix):
         """Inner function to find the longest common subsequence of string `X[0…m-1]` and `Y[0…n-1]`
 
+        Backtrack from the end iteratively with the equality of items recorded when the table was built.
+
         """
-        # return an empty string if the end of either sequence is reached
-        if left_size == 0 or right_size == 0:
-            return []
-
-        # if the last character of `X` and `Y` matches
-        # if left[left_size - 1] == right[right_size - 1]:
-        if self.diff_level(TreeLevel(
-            left=level.left[left_size - 1],
-            right=level.right[right_size - 1],
-            left_path=[*level.left_path, left_size - 1],
-            right_path=[*level.right_path, right_size - 1],
-            up=level
-        ), drill=True) == 1:
-            # append current character (`X[m-1]` or `Y[n-1]`) to LCS of
-            # substring `X[0…m-2]` and `Y[0…n-2]`
-            return self._generate_lcs_pair_list(level, left_size - 1, right_size - 1, dp_table) + [
-                ListItemPair(value=TreeLevel(
-                    left=level.left[left_size - 1],
-                    right=level.right[right_size - 1],
-                    left_path=[*level.left_path, left_size - 1],
-                    right_path=[*level.right_path, right_size - 1],
-                    up=level
-                ), left_index=left_size - 1, right_index=right_size - 1)
-            ]
+        lcs_pair_list = []
+        i, j = left_size, right_size
+
+        # stop if the end of either sequence is reached
+        while i > 0 and j > 0:
+            # if the last character of `X` and `Y` matches
+            if equal_table[i - 1][j - 1]:
+                # append current character (`X[m-1]` or `Y[n-1]`) to LCS of
+                # substring `X[0…m-2]` and `Y[0…n-2]`
+                lcs_pair_list.append(ListItemPair(value=None, left_index=i - 1, right_index=j - 1,
+                                                  score_matrix=score_matrix))
+                i, j = i - 1, j - 1
+                continue
 
-        # otherwise, if the last character of `X` and `Y` are different
+            # otherwise, if the last character of `X` and `Y` are different
 
-        # if a top cell of the current cell has more value than the left
-        # cell, then drop the current character of string `X` and find LCS
-        # of substring `X[0…m-2]`, `Y[0…n-1]`
+            # if a top cell of the current cell has more value than the left
+            # cell, then drop the current character of string `X` and find LCS
+            # of substring `X[0…m-2]`, `Y[0…n-1]`
+            if dp_table[i - 1][j] > dp_table[i][j - 1]:
+                i -= 1
+            else:
+                # if a left cell of the current cell has more value than the top
+                # cell, then drop the current character of string `Y` and find LCS
+                # of substring `X[0…m-1]`, `Y[0…n-2]`
+                j -= 1
 
-        if dp_table[left_size - 1][right_size] > dp_table[left_size][right_size - 1]:
-            return self._generate_lcs_pair_list(level, left_size - 1, right_size, dp_table)
-        else:
-            # if a left cell of the current cell has more value than the top
-            # cell, then drop the current character of string `Y` and find LCS
-            # of substring `X[0…m-1]`, `Y[0…n-2]`
-            return self._generate_lcs_pair_list(level, left_size, right_size - 1, dp_table)
+        lcs_pair_list.reverse()
+        return lcs_pair_list
 
-    def _build_up_lcs_table(self, level: TreeLevel, left_size, right_size, dp_table):
+    def _build_up_lcs_table(self, level: TreeLevel, left_size, right_size, dp_table, equal_table,
+                            score_matrix: ListScoreMatrix):
         """Inner function
 
         To fill the lookup table by finding the length of LCS of substring `X[0…m-1]` and `Y[0…n-1]`
@@ -323,44 +1002,87 @@ class YouchamaJsonDiffer:
         # fill the lookup table in a bottom-up manner
         for i in range(1, left_size + 1):
             for j in range(1, right_size + 1):
-                if self.diff_level(TreeLevel(
-                    left=level.left[i - 1],
-                    right=level.right[j - 1],
-                    left_path=[*level.left_path, i - 1],
-                    right_path=[*level.right_path, j - 1],
-                    up=level
-                ), drill=True) == 1:
+                if score_matrix.is_equal(i - 1, j - 1):
+                    equal_table[i - 1][j - 1] = True
                     dp_table[i][j] = dp_table[i - 1][j - 1] + 1
                 else:
                     dp_table[i][j] = max(dp_table[i - 1][j], dp_table[i][j - 1])
 
-    def generate_lcs_pair_list(self, level: TreeLevel) -> List[ListItemPair]:
+    def _build_up_lcs_table_vectorized(self, level: TreeLevel, left_size, right_size,
+                                       score_matrix: ListScoreMatrix) -> Tuple[np.ndarray, np.ndarray]:
+        """Inner function
+
+        Same as _build_up_lcs_table but each row is filled at once
+
+        dp[i][j] = max(dp[i-1][j], dp[i][j-1], dp[i-1][j-1] + equal(i-1, j-1)),
+        which is max of dp[i][0...j-1] and max(dp[i-1][j], dp[i-1][j-1] + equal(i-1, j-1)), i.e. an accumulated max.
+
+        """
+        equal_table = score_matrix.equality_table()
+
+        dp_type = np.uint16 if min(left_size, right_size) < np.iinfo(np.uint16).max else np.int32
+        dp_table = np.zeros((left_size + 1, right_size + 1), dtype=dp_type)
+        for i in range(1, left_size + 1):
+            prev_row = dp_table[i - 1]
+            np.maximum.accumulate(np.maximum(prev_row[1:], prev_row[:-1] + equal_table[i - 1]), out=dp_table[i, 1:])
+
+        return dp_table, equal_table
+
+    def generate_lcs_pair_list(self, level: TreeLevel, lcs_engine: Union[str, None] = None,
+                               score_matrix: Union[ListScoreMatrix, None] = None) -> List[ListItemPair]:
         """Generate all ListItemPair
 
         Use LCS algorithm to match arrays with taking order into consideration
 
         Args:
             level: a tree level
+            lcs_engine: override the lcs_engine of the differ
+            score_matrix: scores of items to be shared with other phases
 
         Returns:
             List of pairs
         """
+        if lcs_engine is None:
+            lcs_engine = self.lcs_engine
+
+        if score_matrix is None:
+            score_matrix = ListScoreMatrix(self, level)
 
         left_size, right_size = len(level.left), len(level.right)
-        dp_table = [[0 for x in range(right_size + 1)] for y in range(left_size + 1)]
 
-        # fill lookup table
-        self._build_up_lcs_table(level, left_size, right_size, dp_table)
+        if lcs_engine == LCS_ENGINE_MYERS:
+            return [
+                ListItemPair(value=None, left_index=i, right_index=j, score_matrix=score_matrix)
+                for i, j in myers_lcs(left_size, right_size, score_matrix.is_equal)
+            ]
+
+        if lcs_engine == LCS_ENGINE_VECTORIZED:
+            dp_table, equal_table = self._build_up_lcs_table_vectorized(level, left_size, right_size, score_matrix)
+        else:
+            dp_table = [[0 for x in range(right_size + 1)] for y in range(left_size + 1)]
+            equal_table = [bytearray(right_size) for y in range(left_size)]
+
+            # fill lookup table
+            self._build_up_lcs_table(level, left_size, right_size, dp_table, equal_table, score_matrix)
 
         # find the longest common sequence
-        return self._generate_lcs_pair_list(level, left_size, right_size, dp_table)
+        return self._generate_lcs_pair_list(level, left_size, right_size, dp_table, equal_table, score_matrix)
 
     def _list_with_order_partial_matching(
-        self, left_list: List[TreeLevel], right_list: List[TreeLevel]
-    ) -> Tuple[List[TreeLevel], List[TreeLevel], List[TreeLevel]]:
+        self, left_indices: List[int], right_indices: List[int], score_matrix: ListScoreMatrix
+    ) -> Tuple[List[int], List[int], List[Tuple[int, int]]]:
+        """Match items between two LCS pairs by similarity with order
 
-        size_x = 1 + len(left_list)
-        size_y = 1 + len(right_list)
+        Args:
+            left_indices: indices of the left items
+            right_indices: indices of the right items
+            score_matrix: scores of items
+
+        Returns:
+            indices of removed items, indices of added items and pairs of indices of changed items
+        """
+        size_x = 1 + len(left_indices)
+        size_y = 1 + len(right_indices)
         distance_table = [
             [0 for _ in range(size_y)]
             for _ in range(size_x)
@@ -370,17 +1092,11 @@ class YouchamaJsonDiffer:
             for y in reversed(range(size_y - 1)):
                 prev_x_score = distance_table[x + 1][y]
                 prev_y_score = distance_table[x][y + 1]
-                _level = TreeLevel(
-                    left=left_list[x].left,
-                    right=right_list[y].right,
-                    left_path=left_list[x].left_path,
-                    right_path=right_list[y].right_path,
-                    up=None
-                )
-                score = self.diff_level(_level, True) + distance_table[x + 1][y + 1]
+                score = score_matrix.score(left_indices[x], right_indices[y]) + distance_table[x + 1][y + 1]
 
                 distance_table[x][y] = max([prev_x_score, prev_y_score, score])
-        removed, add, delta = [*left_list], [*right_list], []
+
+        matched_left, matched_right, delta = set(), set(), []
 
         x, y = 0, 0
 
@@ -399,87 +1115,151 @@ class YouchamaJsonDiffer:
                 y += 1
                 continue
 
-            removed.remove(left_list[x])
-            add.remove(right_list[y])
-            delta.append(TreeLevel(
-                left=left_list[x].left,
-                right=right_list[y].right,
-                left_path=left_list[x].left_path,
-                right_path=right_list[y].right_path,
-                up=None
-            ))
+            matched_left.add(left_indices[x])
+            matched_right.add(right_indices[y])
+            delta.append((left_indices[x], right_indices[y]))
 
             # by updating at last
             x += 1
             y += 1
 
+        removed = [i for i in left_indices if i not in matched_left]
+        add = [i for i in right_indices if i not in matched_right]
         return removed, add, delta
 
-    def _compare_list_with_order(self, level: TreeLevel, drill=False) -> float:
+    def _report_list_partial_matching(self, level: TreeLevel, removed: List[int], add: List[int]):
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        root_path_node = self.path_registry.root
+        for i in removed:
+            self.report(EVENT_LIST_REMOVE, TreeLevel(left=level.left[i], right=PLACE_HOLDER_NON_EXIST, up=None,
+                                                     left_path_node=left_path_node.child(i),
+                                                     right_path_node=root_path_node))
 
-        lcs_pair_list = self.generate_lcs_pair_list(level)
+        for i in add:
+            self.report(EVENT_LIST_ADD, TreeLevel(left=PLACE_HOLDER_NON_EXIST, right=level.right[i], up=None,
+                                                  left_path_node=root_path_node,
+                                                  right_path_node=right_path_node.child(i)))
 
-        left_indices, right_indices = list(range(len(level.left))), list(range(len(level.right)))
+    def _get_list_matching(self, level: TreeLevel, drill: bool, kind: str,
+                           match: Callable[[], ListMatching]) -> ListMatching:
+        """Get how items of two arrays are matched; computed by match once in drill mode and cached
+
+        The matching only depends on drill scores of items, so the report phase replays the matching found by drill
+        mode instead of matching the arrays again.
+
+        Args:
+            level: the tree level of the arrays
+            drill: whether this diff is in drill mode.
+            kind: how the arrays are matched
+            match: () => the matching
+
+        Returns:
+            The matching
+        """
+        if not self.use_cache or len(level.left) * len(level.right) < LIST_MATCHING_MIN_PAIRS:
+            # matching small arrays again is cheaper than keeping their matchings
+            return match()
+
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        cache_key = (left_path_node.id, right_path_node.id, kind, LIST_MATCHING)
+        if not drill:
+            # replays are not lookups of drill mode, so they are left out of the hits and misses of the cache
+            matching = self.cache.peek(cache_key)
+            return match() if matching is None else matching
+
+        matching = self.cache.get(cache_key)
+        if matching is None:
+            matching = match()
+            # the report phase visits a level once, so only matchings of drill mode are asked again
+            self.cache.put(cache_key, matching)
+        return matching
 
-        left_data: List[TreeLevel] = [
-            TreeLevel(left=level.left[i], left_path=[*level.left_path, i],
-                      right=PLACE_HOLDER_NON_EXIST, right_path=[], up=None) for i in left_indices]
+    def _list_with_order_matching(self, level: TreeLevel, lcs_engine: str,
+                                  score_matrix: ListScoreMatrix) -> ListMatching:
+        """Match items of arrays with order
+
+        Returns:
+            Index pairs of the LCS, and (removed, add, delta) of the fuzzy matching between every two LCS pairs
+            and after the last one; see _list_with_order_partial_matching
+        """
+        lcs_pairs = tuple(
+            (pair.left_index, pair.right_index) for pair in self.generate_lcs_pair_list(level, lcs_engine, score_matrix)
+        )
 
-        right_data: List[TreeLevel] = [
-            TreeLevel(left=PLACE_HOLDER_NON_EXIST, left_path=[],
-                      right=level.right[i], right_path=[*level.right_path, i], up=None) for i in right_indices]
+        left_indices, right_indices = list(range(len(level.left))), list(range(len(level.right)))
 
         serial_pair_list: List[Tuple[
-            List[TreeLevel],
-            List[TreeLevel]
+            List[int],
+            List[int]
         ]] = []
 
-        total_score = 0
-        for lcs_pair in lcs_pair_list:
+        for left_index, right_index in lcs_pairs:
             _serial_pair_left, _serial_pair_right = [], []
 
-            # can be different without drill
-            score = self.diff_level(lcs_pair.level, drill)
-            total_score += score
-
-            if not drill:
-                self.report_pair(level)
-
             # fuzzy matching
-            gather_serial_pair(lcs_pair.left_index, left_indices, left_data, _serial_pair_left)
-            gather_serial_pair(lcs_pair.right_index, right_indices, right_data, _serial_pair_right)
+            gather_serial_pair(left_index, left_indices, range(len(level.left)), _serial_pair_left)
+            gather_serial_pair(right_index, right_indices, range(len(level.right)), _serial_pair_right)
 
             serial_pair_list.append((_serial_pair_left, _serial_pair_right))
 
-        serial_pair_list.append((
-            [TreeLevel(left=level.left[i], left_path=[*level.left_path, i],
-                       right=PLACE_HOLDER_NON_EXIST, right_path=[], up=None) for i in left_indices],
-            [TreeLevel(left=PLACE_HOLDER_NON_EXIST, left_path=[],
-                       right=level.right[i], right_path=[*level.right_path, i], up=None) for i in right_indices],
-        ))
+        serial_pair_list.append((left_indices, right_indices))
 
-        # fuzzy matching
-        for left_serial, right_serial in serial_pair_list:
-            removed, add, delta = self._list_with_order_partial_matching(left_serial, right_serial)
+        return lcs_pairs, tuple(
+            self._list_with_order_partial_matching(left_serial, right_serial, score_matrix)
+            for left_serial, right_serial in serial_pair_list
+        )
 
-            if not drill:
-                for tl in removed:
-                    self.report(EVENT_LIST_REMOVE, tl)
+    def _compare_list_with_order(self, level: TreeLevel, drill=False, lcs_engine: Union[str, None] = None) -> float:
+        return self._run_steps(self._compare_list_with_lcs_steps(level, drill, lcs_engine))
 
-                for tl in add:
-                    self.report(EVENT_LIST_ADD, tl)
+    def _compare_list_with_lcs_steps(self, level: TreeLevel, drill: bool, lcs_engine: Union[str, None]) -> CompareSteps:
+        """Steps of _compare_list_with_order
 
-            for tl in delta:
-                # 这样子取报告
-                score = self.diff_level(tl, drill)
-                total_score += score
+        """
+        if lcs_engine is None:
+            lcs_engine = self.lcs_engine
 
-                if not drill:
-                    self.report_pair(tl)
+        score_matrix = ListScoreMatrix(self, level)
+        lcs_pairs, partial_matchings = self._get_list_matching(
+            level, drill, lcs_engine, lambda: self._list_with_order_matching(level, lcs_engine, score_matrix)
+        )
+
+        total_score = 0
+        for left_index, right_index in lcs_pairs:
+            if drill:
+                total_score += score_matrix.score(left_index, right_index)
+                continue
+            # can be different without drill
+            total_score += yield score_matrix.item_level(left_index, right_index)
+            self.report_pair(level)
+
+        left_path_node, right_path_node = self.get_path_nodes(level)
+
+        # fuzzy matching
+        for removed, add, delta in partial_matchings:
+            if drill:
+                for li, ri in delta:
+                    total_score += score_matrix.score(li, ri)
+                continue
+
+            self._report_list_partial_matching(level, removed, add)
+
+            for li, ri in delta:
+                # 这样子取报告
+                tl = TreeLevel(left=level.left[li], right=level.right[ri], up=None,
+                               left_path_node=left_path_node.child(li), right_path_node=right_path_node.child(ri))
+                total_score += yield tl
+                self.report_pair(tl)
 
         return total_score / max([len(level.left), len(level.right)])
 
     def _compare_list_with_order_fast(self, level: TreeLevel, drill=False) -> float:
+        return self._run_steps(self._compare_list_with_order_fast_steps(level, drill))
+
+    def _compare_list_with_order_fast_steps(self, level: TreeLevel, drill: bool) -> CompareSteps:
+        """Steps of _compare_list_with_order_fast
+
+        """
         # index -> index的比较即可
         # 多出部分即超出
         len_left = len(level.left)
@@ -488,55 +1268,71 @@ class YouchamaJsonDiffer:
         min_len = min([len_left, len_right])
         max_len = max([len(level.left), len(level.right)])
 
+        left_path_node, right_path_node = self.get_path_nodes(level)
+
+        farmed = {}
+        if not drill and self.parallel_executor is not None:
+            farmed = self._farm_out_subtrees(level, range(min_len))
+
         total_score = 0
         for i in range(min_len):
-            _score = self.diff_level(
-                TreeLevel(
+            if drill:
+                total_score += self.score(level.left[i], level.right[i], left_path_node.child(i),
+                                          right_path_node.child(i), up=level)
+            elif i in farmed:
+                total_score += self._merge_subtree(*farmed[i])
+            else:
+                total_score += yield TreeLevel(
                     left=level.left[i],
                     right=level.right[i],
-                    left_path=[*level.left_path, i],
-                    right_path=[*level.right_path, i],
-                    up=level
-                ),
-                drill=drill
-            )
-
-            total_score += _score
+                    up=level,
+                    left_path_node=left_path_node.child(i),
+                    right_path_node=right_path_node.child(i)
+                )
 
-        if not drill:
-            # 这些就是新增的
-            for i in range(min_len, len_left):
-                self.report(EVENT_LIST_REMOVE, TreeLevel(
-                    left=level.left[i],
-                    right=PLACE_HOLDER_NON_EXIST,
-                    left_path=[*level.left_path, i],
-                    right_path=[],
-                    up=level
-                ))
+        if drill:
+            return total_score / max_len
+
+        # 这些就是新增的
+        for i in range(min_len, len_left):
+            self.report(EVENT_LIST_REMOVE, TreeLevel(
+                left=level.left[i],
+                right=PLACE_HOLDER_NON_EXIST,
+                up=level,
+                left_path_node=left_path_node.child(i),
+                right_path_node=self.path_registry.root
+            ))
 
-            # 这些就是删除的
-            for i in range(min_len, len_right):
-                self.report(EVENT_LIST_ADD, TreeLevel(
-                    left=PLACE_HOLDER_NON_EXIST,
-                    right=level.right[i],
-                    left_path=[],
-                    right_path=[*level.right_path, i],
-                    up=level
-                ))
+        # 这些就是删除的
+        for i in range(min_len, len_right):
+            self.report(EVENT_LIST_ADD, TreeLevel(
+                left=PLACE_HOLDER_NON_EXIST,
+                right=level.right[i],
+                up=level,
+                left_path_node=self.path_registry.root,
+                right_path_node=right_path_node.child(i)
+            ))
 
         return total_score / max_len
 
-    def compare_list_with_order(self, level: TreeLevel, drill=False) -> float:
+    def compare_list_with_order(self, level: TreeLevel, drill=False, lcs_engine: Union[str, None] = None) -> float:
         """Compare two arrays with order
 
         Args:
             level: the tree level to be diffed
             drill: whether this diff is in drill mode.
+            lcs_engine: override the lcs_engine of the differ; see YouchamaJsonDiffer
 
         Returns:
             A score between 0~1 to describe how similar level.left and level.right are
         """
+        return self._run_steps(self._compare_list_with_order_steps(level, drill, lcs_engine))
+
+    def _compare_list_with_order_steps(self, level: TreeLevel, drill: bool,
+                                       lcs_engine: Union[str, None] = None) -> CompareSteps:
+        """Steps of compare_list_with_order
 
+        """
         max_len = max([len(level.left), len(level.right)])
 
         if self.debug:
@@ -546,18 +1342,34 @@ class YouchamaJsonDiffer:
             return 1
 
         if self.fast_mode:
-            score = self._compare_list_with_order_fast(level, drill)
+            score = yield from self._compare_list_with_order_fast_steps(level, drill)
         else:
             # than use similarity to match the others
-            score = self._compare_list_with_order(level, drill)
+            score = yield from self._compare_list_with_lcs_steps(level, drill, lcs_engine)
         if self.debug:
             print(f"list score = {score} for {level}")
 
         return score
 
+    def _unordered_candidate_pairs(self, left_indices: List[int], right_indices: List[int],
+                                   score_matrix: ListScoreMatrix) -> Iterable[Tuple[int, int]]:
+        """Pairs of positions in left_indices and right_indices worth scoring
+
+        """
+        level = score_matrix.level
+        if self.unordered_candidates is not None and score_matrix.item_ids is not None:
+            pairs = self.unordered_candidates.candidate_pairs(
+                [level.left[i] for i in left_indices], [level.right[i] for i in right_indices]
+            )
+            if pairs is not None:
+                if self.debug:
+                    print(f"candidate pairs = {len(pairs)} of {len(left_indices) * len(right_indices)}")
+                return pairs
+        return itertools.product(range(len(left_indices)), range(len(right_indices)))
+
     def _list_without_order_partial_matching(
-        self, left_list: List[TreeLevel], right_list: List[TreeLevel]
-    ) -> Tuple[List[TreeLevel], List[TreeLevel], List[TreeLevel]]:
+        self, left_indices: List[int], right_indices: List[int], score_matrix: ListScoreMatrix
+    ) -> Tuple[List[int], List[int], List[Tuple[int, int]]]:
         """Use KM algorithm to match pairs
 
         First construct a table
@@ -569,128 +1381,150 @@ class YouchamaJsonDiffer:
         Then matching
 
         Args:
-            left_list:
-            right_list:
+            left_indices: indices of the left items
+            right_indices: indices of the right items
+            score_matrix: scores of items
 
         Returns:
-
+            indices of removed items, indices of added items and pairs of indices of changed items
         """
-        removed, add, delta = [*left_list], [*right_list], []
-
-        size_left = len(left_list)
-        size_right = len(right_list)
+        size_left = len(left_indices)
+        size_right = len(right_indices)
 
         if size_left == 0 or size_right == 0:
-            return removed, add, delta
+            return [*left_indices], [*right_indices], []
 
-        distance_table = [
-            [0.0 for _ in range(size_right)]
-            for _ in range(size_left)
-        ]
+        distance_table = np.zeros((size_left, size_right), dtype=np.float64)
 
-        for li in range(size_left):
-            for ri in range(size_right):
-                level = TreeLevel(
-                    left=left_list[li].left,
-                    right=right_list[ri].right,
-                    left_path=[*left_list[li].left_path],
-                    right_path=[*right_list[ri].right_path],
-                    up=None
-                )
-                score = self.diff_level(level, drill=True)
-                if self.debug:
-                    print(f"distance_table[{ri}][{li}]", ri, li, score, level)
+        for li, ri in self._unordered_candidate_pairs(left_indices, right_indices, score_matrix):
+            score = score_matrix.score(left_indices[li], right_indices[ri])
+            if self.debug:
+                print(f"distance_table[{ri}][{li}]", ri, li, score)
 
-                distance_table[li][ri] = score
+            distance_table[li][ri] = score
 
         if self.debug:
             print("distance_table>>>", distance_table)
 
-        matcher = KMMatcher(distance_table)
+        if self.split_assignment:
+            matcher = ComponentMatcher(distance_table, matcher=MATCHERS[self.assignment_engine])
+            if self.debug:
+                print("components>>>", matcher.component_stats())
+        else:
+            matcher = MATCHERS[self.assignment_engine](distance_table)
         _, pairs = matcher.solve(verbose=False)
 
         if self.debug:
             print("pairs>>>", pairs)
 
+        matched_left, matched_right, delta = set(), set(), []
         for li, ri in pairs:
             if distance_table[li][ri] != 0:
-                removed.remove(left_list[li])
-                add.remove(right_list[ri])
-                delta.append(TreeLevel(
-                    left=left_list[li].left,
-                    right=right_list[ri].right,
-                    left_path=left_list[li].left_path,
-                    right_path=right_list[ri].right_path,
-                    up=None
-                ))
+                matched_left.add(left_indices[li])
+                matched_right.add(right_indices[ri])
+                delta.append((left_indices[li], right_indices[ri]))
 
+        removed = [i for i in left_indices if i not in matched_left]
+        add = [i for i in right_indices if i not in matched_right]
         return removed, add, delta
 
-    def _compare_list_without_order_post(self, pair_list: List[ListItemPair], level: TreeLevel):
-        matched_left_index = []
-        matched_right_index = []
-        for pair in pair_list:
-            # still can be different under not drill
-            self.diff_level(pair.level, False)
-            self.report_pair(pair.level)
-            matched_left_index.append(pair.left_index)
-            matched_right_index.append(pair.right_index)
-
-        partial_left = [
-            TreeLevel(left=level.left[i], left_path=[*level.left_path, i],
-                      right=PLACE_HOLDER_NON_EXIST, right_path=[], up=None)
-            for i in range(len(level.left)) if i not in matched_left_index]
-        partial_right = [
-            TreeLevel(left=PLACE_HOLDER_NON_EXIST, left_path=[],
-                      right=level.right[i], right_path=[*level.right_path, i], up=None)
-            for i in range(len(level.right)) if i not in matched_right_index]
-
-        removed, add, delta = self._list_without_order_partial_matching(partial_left, partial_right)
-        for tl in removed:
-            self.report(EVENT_LIST_REMOVE, tl)
-
-        for tl in add:
-            self.report(EVENT_LIST_ADD, tl)
-
-        for tl in delta:
-            # 这样子取报告
-            self.diff_level(tl, False)
-            self.report_pair(tl)
+    def _list_without_order_matching(self, score_matrix: ListScoreMatrix) -> ListMatching:
+        """Match equal items of arrays without order
+
+        Returns:
+            Index pairs of equal items
+        """
+        exact_pairs = []
+        matched_right = {}
+        for li in range(score_matrix.left_size):
+            # greedy: the first unmatched right item equal to it
+            ri = score_matrix.find_first_equal(li, matched_right)
+            if ri is None:
+                continue
+            exact_pairs.append((li, ri))
+            matched_right[ri] = True
+        return tuple(exact_pairs)
 
     def compare_list_without_order(self, level: TreeLevel, drill=False) -> float:
+        return self._run_steps(self._compare_list_without_order_steps(level, drill))
 
-        pair_list = []
-        matched_right = {}
-        matched_left = {}
-        for li in range(len(level.left)):
-            for ri in range(len(level.right)):
-                if ri in matched_right:
-                    continue
-                new_level = TreeLevel(
-                    left=level.left[li],
-                    right=level.right[ri],
-                    left_path=[*level.left_path, li],
-                    right_path=[*level.right_path, ri],
-                    up=level
-                )
-                if self.diff_level(new_level, True) == 1:
-                    pair_list.append(ListItemPair(value=new_level, left_index=li, right_index=ri))
-                    matched_right[ri] = True
-                    matched_left[li] = True
-                    break
+    def _compare_list_without_order_steps(self, level: TreeLevel, drill: bool) -> CompareSteps:
+        """Steps of compare_list_without_order
+
+        """
+        score_matrix = ListScoreMatrix(self, level)
+        exact_pairs = self._get_list_matching(
+            level, drill, LIST_MATCHING_WITHOUT_ORDER, lambda: self._list_without_order_matching(score_matrix)
+        )
 
         if not drill:
-            # only in the report phase
-            self._compare_list_without_order_post(pair_list, level)
+            matched_left_index = set()
+            matched_right_index = set()
+            for li, ri in exact_pairs:
+                pair_level = score_matrix.item_level(li, ri)
+                # still can be different under not drill
+                yield pair_level
+                self.report_pair(pair_level)
+                matched_left_index.add(li)
+                matched_right_index.add(ri)
+
+            partial_left = [i for i in range(len(level.left)) if i not in matched_left_index]
+            partial_right = [i for i in range(len(level.right)) if i not in matched_right_index]
+
+            removed, add, delta = self._list_without_order_partial_matching(partial_left, partial_right, score_matrix)
+            self._report_list_partial_matching(level, removed, add)
+
+            left_path_node, right_path_node = self.get_path_nodes(level)
+
+            for li, ri in delta:
+                # 这样子取报告
+                tl = TreeLevel(left=level.left[li], right=level.right[ri], up=None,
+                               left_path_node=left_path_node.child(li), right_path_node=right_path_node.child(ri))
+                yield tl
+                self.report_pair(tl)
 
         if max([len(level.left), len(level.right)]) == 0:
             return 1
-        return len(pair_list) / max([len(level.left), len(level.right)])
+        return len(exact_pairs) / max([len(level.left), len(level.right)])
 
     def compare_list(self, level: TreeLevel, drill=False) -> float:
+        return self._run_steps(self._compare_list_steps(level, drill))
+
+    def _compare_list_steps(self, level: TreeLevel, drill: bool) -> CompareSteps:
+        """Steps of compare_list
+
+        """
         if self.ignore_order_func(level, drill):
-            return self.compare_list_without_order(level, drill)
-        return self.compare_list_with_order(level, drill)
+            method = self.compare_list_without_order
+        else:
+            method = self.compare_list_with_order
+
+        steps = None if drill else self._report_steps.get(method)
+        if steps is None:
+            return method(level, drill)
+        return (yield from steps(level, drill))
+
+    def _dict_remove_diff(self, level: TreeLevel, drill: bool) -> Tuple[bool, float]:
+        if not drill:
+            self.report(EVENT_DICT_REMOVE, TreeLevel(
+                left=level.left,
+                right=PLACE_HOLDER_NON_EXIST,
+                up=level.up,
+                left_path_node=self.get_path_nodes(level)[0],
+                right_path_node=self.path_registry.root
+            ))
+        return True, 0
+
+    def _dict_add_diff(self, level: TreeLevel, drill: bool) -> Tuple[bool, float]:
+        if not drill:
+            self.report(EVENT_DICT_ADD, TreeLevel(
+                left=PLACE_HOLDER_NON_EXIST,
+                right=level.right,
+                up=level.up,
+                left_path_node=self.path_registry.root,
+                right_path_node=self.get_path_nodes(level)[1]
+            ))
+        return True, 0
 
     def compare_dict(self, level: TreeLevel, drill=False) -> float:
         """Compare Dict
@@ -702,6 +1536,12 @@ class YouchamaJsonDiffer:
         Returns:
             A score between 0~1 to describe how similar **level.left** and **level.right** are.
             The score will be average score for all scores for all keys.
+        """
+        return self._run_steps(self._compare_dict_steps(level, drill))
+
+    def _compare_dict_steps(self, level: TreeLevel, drill: bool) -> CompareSteps:
+        """Steps of compare_dict
+
         """
         score = 0
         all_keys = list(set(list(level.left.keys()) + list(level.right.keys())))
@@ -710,77 +1550,171 @@ class YouchamaJsonDiffer:
         if self.debug:
             print(f"[compare_dict>>>] {level}")
 
-        ref = self
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        root_path_node = self.path_registry.root
 
-        def __dict_remove_diff(_level: 'TreeLevel', _drill: bool):
-            if not _drill:
-                ref.report(EVENT_DICT_REMOVE, TreeLevel(
-                    left=_level.left,
-                    right=PLACE_HOLDER_NON_EXIST,
-                    left_path=[*_level.left_path],
-                    right_path=[],
-                    up=level
-                ))
-            return True, 0
-
-        def __dict_add_diff(_level: 'TreeLevel', _drill: bool):
-            if not _drill:
-                ref.report(EVENT_DICT_ADD, TreeLevel(
-                    left=PLACE_HOLDER_NON_EXIST,
-                    right=_level.right,
-                    left_path=[],
-                    right_path=[*_level.right_path],
-                    up=level
-                ))
-            return True, 0
+        farmed = {}
+        if not drill and self.parallel_executor is not None and left_path_node is root_path_node and \
+                right_path_node is root_path_node:
+            farmed = self._farm_out_subtrees(level, [k for k in all_keys if k in level.right and k in level.left])
 
         for k in all_keys:
             if k in level.right and k in level.left:
-                _score = self.diff_level(TreeLevel(
-                    left=level.left[k],
-                    right=level.right[k],
-                    left_path=[*level.left_path, k],
-                    right_path=[*level.right_path, k],
-                    up=level
-                ), drill=drill)
+                if drill:
+                    _score = self.score(level.left[k], level.right[k], left_path_node.child(k),
+                                        right_path_node.child(k), up=level)
+                elif k in farmed:
+                    _score = self._merge_subtree(*farmed[k])
+                else:
+                    _score = yield TreeLevel(
+                        left=level.left[k],
+                        right=level.right[k],
+                        up=level,
+                        left_path_node=left_path_node.child(k),
+                        right_path_node=right_path_node.child(k)
+                    )
 
                 if self.debug:
                     print(f"[_score = {_score}] for [key={k}] {level}")
 
                 score += _score
-
                 if not drill:
                     self.report_pair(level)
                 continue
 
             if k in level.left:
-                _score = self.diff_level(TreeLevel(
+                child = TreeLevel(
                     left=level.left[k],
                     right=PLACE_HOLDER_NON_EXIST,
-                    left_path=[*level.left_path, k],
-                    right_path=[],
                     up=level,
-                    diff=__dict_remove_diff
-                ), drill=drill)
-                score += _score
-                continue
-
-            if k in level.right:
-                _score = self.diff_level(TreeLevel(
+                    diff=self._dict_remove_diff,
+                    left_path_node=left_path_node.child(k),
+                    right_path_node=root_path_node
+                )
+            else:
+                child = TreeLevel(
                     left=PLACE_HOLDER_NON_EXIST,
                     right=level.right[k],
-                    left_path=[],
-                    right_path=[*level.right_path, k],
                     up=level,
-                    diff=__dict_add_diff
-                ), drill=drill)
-                score += _score
-                continue
+                    diff=self._dict_add_diff,
+                    left_path_node=root_path_node,
+                    right_path_node=right_path_node.child(k)
+                )
+            if drill:
+                score += self.diff_level(child, drill)
+            else:
+                score += yield child
 
         if len(all_keys) == 0:
             return 1
         return score / len(all_keys)
 
+    def _farm_out_subtrees(self, level: TreeLevel, keys: Iterable) -> Dict[Any, Tuple[Future, int]]:
+        """Submit big children of a level of the report phase to the parallel executor
+
+        Children are packed in order into chunks of at least min_size values; the rest stay in process.
+
+        Args:
+            level: the tree level whose children are diffed independently of each other
+            keys: keys of the children which are on both sides, in order
+
+        Returns:
+            {key: (future of the chunk, position of the key in the chunk)} of the children submitted
+        """
+        executor = self.parallel_executor
+        chunks: List[List] = []
+        chunk, chunk_size = [], 0
+        for k in keys:
+            left, right = level.left[k], level.right[k]
+            if self.fingerprint_index is not None and self.fingerprint_index.is_identical(left, right):
+                continue
+            chunk.append(k)
+            chunk_size += count_values(left, executor.min_size) + count_values(right, executor.min_size)
+            if chunk_size >= executor.min_size:
+                chunks.append(chunk)
+                chunk, chunk_size = [], 0
+
+        if len(chunks) == 0:
+            return {}
+
+        left_path, right_path = level.left_path, level.right_path
+        if unpack_value(None, self.left, left_path) is not level.left or \
+                unpack_value(None, self.right, right_path) is not level.right:
+            # workers only know the values of the jsons
+            return {}
+
+        if not executor.start(self, self._worker_options):
+            return {}
+
+        farmed = {}
+        for chunk in chunks:
+            future = executor.submit(left_path, right_path, chunk)
+            for position, k in enumerate(chunk):
+                farmed[k] = (future, position)
+        return farmed
+
+    def _merge_subtree(self, future: Future, position: int) -> float:
+        """Report the records of a child diffed by a worker as if it was diffed here
+
+        Returns:
+            The score of the child
+        """
+        score, records = future.result()[position]
+        for event, left_path, right_path, left, right, info in records:
+            level = TreeLevel(
+                left=unpack_value(left, self.left, left_path),
+                right=unpack_value(right, self.right, right_path),
+                up=None,
+                left_path_node=self.path_registry.from_list(left_path),
+                right_path_node=self.path_registry.from_list(right_path)
+            )
+            if event == EVENT_PAIR:
+                self.report_pair(level)
+            else:
+                self.report(event, level, info)
+        return score
+
+    def diff_subtrees(self, left_path: List, right_path: List, keys: List) -> List[Tuple[float, List[Tuple]]]:
+        """Diff children of the level at a pair of paths in the report phase; called in workers of parallel_executor
+
+        Args:
+            left_path: left path of the level
+            right_path: right path of the level
+            keys: keys of the children
+
+        Returns:
+            (score, records packed by parallel.pack_record) of every child in the order of keys
+        """
+        root_path_node = self.path_registry.root
+        level = TreeLevel(left=self.left, right=self.right, up=None,
+                          left_path_node=root_path_node, right_path_node=root_path_node)
+        for left_key, right_key in zip(left_path, right_path):
+            level = TreeLevel(
+                left=level.left[left_key],
+                right=level.right[right_key],
+                up=level,
+                left_path_node=level.left_path_node.child(left_key),
+                right_path_node=level.right_path_node.child(right_key)
+            )
+
+        record_sink = self.record_sink
+        results = []
+        try:
+            for k in keys:
+                records = []
+                self.record_sink = CallbackRecordSink(records.append)
+                score = self.diff_level(TreeLevel(
+                    left=level.left[k],
+                    right=level.right[k],
+                    up=level,
+                    left_path_node=level.left_path_node.child(k),
+                    right_path_node=level.right_path_node.child(k)
+                ), False)
+                results.append((score, [pack_record(record, self.left, self.right) for record in records]))
+        finally:
+            self.record_sink = record_sink
+        return results
+
     def compare_primitive(self, level: TreeLevel, drill=False) -> float:
         """Compare primitive values
 
@@ -816,14 +1750,29 @@ class YouchamaJsonDiffer:
             A score between 0~1 to describe how similar **level.left** and **level.right** are.
 
         """
-        for operator in self.custom_operators:
-            if operator.match(level):
-                skip, score = operator.diff(level, self, drill)
-                if skip:
-                    return skip, score
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        for operator in self.operator_dispatcher.match(level, left_path_node, right_path_node):
+            skip, score = operator.diff(level, self, drill)
+            if skip:
+                return skip, score
 
         return False, -1
 
+    def _is_plain_leaf(self, level: TreeLevel) -> bool:
+        """Whether a level is a pair of primitive values which no custom operator can match
+
+        Such a level is only compared by compare_primitive.
+        """
+        if level._diff is not None or (type(level.left), type(level.right)) in self._structured_type_pairs:
+            return False
+        if len(self.operator_dispatcher.operators) == 0:
+            return True
+        left_path_node, right_path_node = self.get_path_nodes(level)
+        # the same path as TreeLevel.get_path
+        return not self.operator_dispatcher.may_match(
+            left_path_node if level.left != PLACE_HOLDER_NON_EXIST else right_path_node
+        )
+
     def _diff_level(self, level: TreeLevel, drill: bool) -> float:
         """Base diff function
 
@@ -837,10 +1786,19 @@ class YouchamaJsonDiffer:
         """
 
         try:
+            if self._is_plain_leaf(level):
+                # fingerprints never tell primitives are identical
+                return self.compare_primitive(level, drill)
 
             if not drill:
-                # just report
-                self.report_pair(level)
+                score, steps = self._start_report(level)
+                if steps is None:
+                    return score
+                return self._run_steps(steps)
+
+            if self.fingerprint_index is not None and level.diff is None and \
+                    self.fingerprint_index.is_identical(level.left, level.right):
+                return 1
 
             skip, score = self.use_custom_operators(level, drill)
 
@@ -852,28 +1810,168 @@ class YouchamaJsonDiffer:
                 if skip:
                     return score
 
+            # values of different types are reported as a value_change by compare_primitive
+            handler = self.type_handlers.get((type(level.left), type(level.right)), self.compare_primitive)
+            return handler(level, drill)
+        except DiffLevelException as e:
+            raise e
+        except Exception as e:
+            raise DiffLevelException(e, level, drill) from e
+
+    def _start_report(self, level: TreeLevel) -> Tuple[Union[float, None], Union[CompareSteps, None]]:
+        """Report a level which is not a plain leaf up to its type handler
+
+        Returns:
+            (score, None) if the level is done, or (None, report steps of the type handler)
+        """
+        # just report
+        self.report_pair(level)
+
+        if self.fingerprint_index is not None and level.diff is None and \
+                self.fingerprint_index.is_identical(level.left, level.right):
+            self._report_identical_pairs(level)
+            return 1, None
+
+        skip, score = self.use_custom_operators(level, False)
+
+        if skip:
+            return score, None
+
+        if level.diff is not None:
+            skip, score = level.diff(False)
+            if skip:
+                return score, None
+
+        # values of different types are reported as a value_change by compare_primitive
+        handler = self.type_handlers.get((type(level.left), type(level.right)), self.compare_primitive)
+        steps = self._report_steps.get(handler)
+        if steps is None:
+            # e.g. compare_primitive or a compare method overridden by a subclass
+            return handler(level, False), None
+        return None, steps(level, False)
+
+    def _run_steps(self, steps: CompareSteps) -> float:
+        """Run steps of a compare method by recursion: every child level yielded is diffed by diff_level
+
+        Returns:
+            The score returned by the steps
+        """
+        try:
+            level = next(steps)
+            while True:
+                level = steps.send(self.diff_level(level, False))
+        except StopIteration as e:
+            return e.value
+
+    def _diff_with_stack(self, level: TreeLevel) -> float:
+        """The stack engine: same as diff_level(level, False) with an explicit stack of report steps
+
+        Returns:
+            A score between 0~1 to describe how similar **level.left** and **level.right** are.
+        """
+        # (level, its report steps, its cache key)
+        stack: List[Tuple[TreeLevel, CompareSteps, Union[Tuple, None]]] = []
+        score = self._push_report_level(level, stack)
+        while len(stack) > 0:
+            current, steps, cache_key = stack[-1]
             try:
-                level_type = level.get_type()
-            except DifferentTypeException:
-                # just use compare_primitive to report a value_change
-                return self.compare_primitive(level, drill)
+                child = steps.send(score)
+            except StopIteration as e:
+                stack.pop()
+                score = e.value
+                if cache_key is not None:
+                    self.cache.put(cache_key, score)
+                continue
+            except DiffLevelException as e:
+                raise e
+            except Exception as e:
+                raise DiffLevelException(e, current, False) from e
 
-            if level_type == list:
-                return self.compare_list(level, drill)
+            score = self._push_report_level(child, stack)
+        return score
 
-            if level_type == dict:
-                return self.compare_dict(level, drill)
+    def _push_report_level(self, level: TreeLevel, stack: List) -> Union[float, None]:
+        """Start diffing a level of the report phase for _diff_with_stack
 
-            return self.compare_primitive(level, drill)
+        Returns:
+            The score of the level; None if its report steps are pushed to the stack
+        """
+        if self._is_plain_leaf(level):
+            # comparing primitive values is cheaper than caching them
+            return self._diff_level(level, False)
+
+        cache_key = None
+        if self.use_cache:
+            left_path_node, right_path_node = self.get_path_nodes(level)
+            cache_key = (left_path_node.id, right_path_node.id, False)
+            score = self.cache.get(cache_key)
+            if score is not None:
+                return score
+
+        try:
+            score, steps = self._start_report(level)
         except DiffLevelException as e:
             raise e
         except Exception as e:
-            raise DiffLevelException(f"Error {e} [drill={drill}] when compare [{level}]")
+            raise DiffLevelException(e, level, False) from e
+
+        if steps is not None:
+            stack.append((level, steps, cache_key))
+            return None
+        if cache_key is not None:
+            self.cache.put(cache_key, score)
+        return score
+
+    def _drill_within_budget(self, key: Tuple, compute: Callable[..., Any], *args):
+        """Run a drill of the stack engine, nesting drills by recursion at most DRILL_DEPTH_BUDGET deep
+
+        A drill any deeper unwinds by _DrillDeferred to the outermost drill, which runs it with an explicit stack of
+        deferred drills and then runs again to find its result in _drill_results.
+        Drills report nothing, so they are safe to run again.
+
+        Args:
+            key: (left path id, right path id, kind) of the drill
+            compute: the drill
+            *args: arguments of compute
+
+        Returns:
+            The result of the drill
+        """
+        if self._drill_depth > 0:
+            result = self._drill_results.get(key)
+            if result is not None:
+                return result
+            if self._drill_depth >= DRILL_DEPTH_BUDGET:
+                raise _DrillDeferred(key, compute, args)
+            return self._run_drill(key, compute, args)
+
+        pending = [(key, compute, args)]
+        try:
+            while len(pending) > 0:
+                try:
+                    self._run_drill(*pending[-1])
+                except _DrillDeferred as deferred:
+                    pending.append((deferred.key, deferred.compute, deferred.args))
+                    continue
+                pending.pop()
+            return self._drill_results[key]
+        finally:
+            self._drill_results.clear()
+
+    def _run_drill(self, key: Tuple, compute: Callable[..., Any], args: Tuple):
+        self._drill_depth += 1
+        try:
+            result = compute(*args)
+        finally:
+            self._drill_depth -= 1
+        self._drill_results[key] = result
+        return result
 
     def diff_level(self, level: TreeLevel, drill: bool) -> float:
         """Diff level function\
 
         It is a wrapper of _diff_level with cache mechanism.
+        The stack engine diffs the report phase by _diff_with_stack and bounds the depth of drills.
 
         Args:
             level: the tree level to be diffed
@@ -883,19 +1981,30 @@ class YouchamaJsonDiffer:
             A score between 0~1 to describe how similar **level.left** and **level.right** are.
 
         """
-        if self.use_cache:
-            cache_key = f"[{level.get_key()}]@[{drill}]"
-
-            if cache_key not in self.cache:
+        if self._drill_results is not None:
+            if not drill:
+                return self._diff_with_stack(level)
+            left_path_node, right_path_node = self.get_path_nodes(level)
+            return self._drill_within_budget((left_path_node.id, right_path_node.id, True), self._cached_diff_level,
+                                             level, drill)
+        return self._cached_diff_level(level, drill)
+
+    def _cached_diff_level(self, level: TreeLevel, drill: bool) -> float:
+        if self.use_cache and (self.debug or not self._is_plain_leaf(level)):
+            # comparing primitive values is cheaper than caching them
+            left_path_node, right_path_node = self.get_path_nodes(level)
+            cache_key = (left_path_node.id, right_path_node.id, drill)
+
+            score = self.cache.get(cache_key)
+            if score is None:
                 score = self._diff_level(level, drill)
                 if self.debug:
                     print(f"save score = {score} for cache_key = {cache_key} with level = {level}")
-                self.cache[cache_key] = score
+                self.cache.put(cache_key, score)
             else:
                 if self.debug:
                     print(f"hit cache_key = {cache_key} for level {level}")
 
-            score = self.cache[cache_key]
             if self.debug:
                 self.key_ctr[cache_key] = 1 + self.key_ctr.get(cache_key, 0)
                 print(f"score = {score} for level: {level}")
@@ -906,23 +2015,288 @@ class YouchamaJsonDiffer:
             print(f"score = {score} for level: {level}")
         return score
 
+    def score(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+              up: Union[TreeLevel, None] = None) -> float:
+        """Drill score of two values; a lightweight diff_level(TreeLevel(...), drill=True)
+
+        A TreeLevel is only created if a custom operator may match or the values are containers to be compared.
+        Cached scores, identical subtrees and primitive values are scored without it.
+
+        Args:
+            left: left value
+            right: right value
+            left_path_node: interned path of the left value
+            right_path_node: interned path of the right value
+            up: the parent TreeLevel
+
+        Returns:
+            A score between 0~1 to describe how similar left and right are.
+        """
+        if self.debug:
+            return self.diff_level(TreeLevel(left=left, right=right, up=up, left_path_node=left_path_node,
+                                             right_path_node=right_path_node), drill=True)
+
+        if self._drill_results is not None:
+            return self._drill_within_budget((left_path_node.id, right_path_node.id, True), self._cached_score,
+                                             left, right, left_path_node, right_path_node, up)
+        return self._cached_score(left, right, left_path_node, right_path_node, up)
+
+    def _cached_score(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+                      up: Union[TreeLevel, None]) -> float:
+        cache_key = None
+        if self.use_cache:
+            cache_key = (left_path_node.id, right_path_node.id, True)
+            score = self.cache.get(cache_key)
+            if score is not None:
+                return score
+
+        content_key = self._get_content_key(left, right, left_path_node)
+        score = None
+        if content_key is not None:
+            score = self.content_cache.get(content_key)
+        if score is None:
+            score = self._score(left, right, left_path_node, right_path_node, up)
+            if content_key is not None:
+                self.content_cache.put(content_key, score)
+
+        if cache_key is not None:
+            self.cache.put(cache_key, score)
+        return score
+
+    def _get_content_key(self, left, right, left_path_node: PathNode) -> Union[Tuple, None]:
+        """Key of the drill score of a pair of contents in content_cache
+
+        Returns:
+            (left content id, right content id, context) or None if the score may depend on more than that
+        """
+        if self.content_cache is None or self.fingerprint_index is None:
+            return None
+        content_ids = self.fingerprint_index.content_ids(left, right)
+        if content_ids is None:
+            return None
+
+        # arrays are diffed with order or not by the path of the left side
+        if self._content_context == CONTENT_CONTEXT_STRUCTURE:
+            return (*content_ids, self._structural_paths.get(left_path_node).id)
+        if self._content_context == CONTENT_CONTEXT_PATH:
+            return (*content_ids, left_path_node.id)
+        return content_ids
+
+    def _score(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+               up: Union[TreeLevel, None]) -> float:
+        """Same as _diff_level in drill mode
+
+        """
+        if self.fingerprint_index is not None and self.fingerprint_index.is_identical(left, right):
+            return 1
+
+        # the same path as TreeLevel.get_path
+        path_node = left_path_node if left != PLACE_HOLDER_NON_EXIST else right_path_node
+        if not self._compare_overridden and not self.operator_dispatcher.may_match(path_node) and \
+                (type(left), type(right)) not in self._structured_type_pairs:
+            try:
+                # compare_primitive
+                return 0 if left != right else 1
+            except Exception:
+                pass
+
+        return self._diff_level(TreeLevel(left=left, right=right, up=up, left_path_node=left_path_node,
+                                          right_path_node=right_path_node), drill=True)
+
+    def is_exact(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+                 up: Union[TreeLevel, None] = None) -> bool:
+        """Whether two values are diffed to 1 in drill mode; same as score(...) == 1
+
+        It stops at the first difference, e.g. a missing key of a dict or an unequal item of an array, so it is much
+        cheaper than scoring when the values are different.
+        A match is cached as the drill score 1 and a mismatch under (left id, right id, EXACT_PROBE).
+
+        Args:
+            left: left value
+            right: right value
+            left_path_node: interned path of the left value
+            right_path_node: interned path of the right value
+            up: the parent TreeLevel
+
+        Returns:
+            True if the drill score is 1
+        """
+        if self.debug:
+            return self.score(left, right, left_path_node, right_path_node, up) == 1
+
+        if self._drill_results is not None:
+            return self._drill_within_budget((left_path_node.id, right_path_node.id, EXACT_PROBE),
+                                             self._cached_is_exact, left, right, left_path_node, right_path_node, up)
+        return self._cached_is_exact(left, right, left_path_node, right_path_node, up)
+
+    def _cached_is_exact(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+                         up: Union[TreeLevel, None]) -> bool:
+        if not self.use_cache:
+            return self._is_exact(left, right, left_path_node, right_path_node, up)
+
+        score = self.cache.get((left_path_node.id, right_path_node.id, True))
+        if score is not None:
+            return score == 1
+        cache_key = (left_path_node.id, right_path_node.id, EXACT_PROBE)
+        if self.cache.get(cache_key) is not None:
+            return False
+
+        exact = self._is_exact(left, right, left_path_node, right_path_node, up)
+        if exact:
+            self.cache.put((left_path_node.id, right_path_node.id, True), 1)
+        else:
+            self.cache.put(cache_key, 0)
+        return exact
+
+    def _is_exact(self, left, right, left_path_node: PathNode, right_path_node: PathNode,
+                  up: Union[TreeLevel, None]) -> bool:
+        """Same as _score(...) == 1
+
+        """
+        if self._compare_overridden:
+            # nobody knows when a compare method of a subclass gives 1
+            return self.score(left, right, left_path_node, right_path_node, up) == 1
+
+        if self.fingerprint_index is not None:
+            if self.fingerprint_index.is_identical(left, right):
+                return True
+            if self.fingerprint_index.is_distinct(left, right):
+                return False
+
+        # the same path as TreeLevel.get_path
+        if self.operator_dispatcher.may_match(left_path_node if left != PLACE_HOLDER_NON_EXIST else right_path_node):
+            return self.score(left, right, left_path_node, right_path_node, up) == 1
+
+        handler = self.type_handlers.get((type(left), type(right)), self.compare_primitive)
+        if handler == self.compare_primitive:
+            try:
+                return not (left != right)
+            except Exception:
+                # let score raise the DiffLevelException
+                return self.score(left, right, left_path_node, right_path_node, up) == 1
+
+        if handler == self.compare_dict:
+            level = TreeLevel(left=left, right=right, up=up, left_path_node=left_path_node,
+                              right_path_node=right_path_node)
+            if len(left) != len(right) or any(k not in right for k in left):
+                missing = [left_path_node.child(k) for k in left if k not in right] + \
+                          [right_path_node.child(k) for k in right if k not in left]
+                if any(self.operator_dispatcher.may_match(node) for node in missing):
+                    # an operator may score the missing key
+                    return self.score(left, right, left_path_node, right_path_node, up) == 1
+                return False
+            return all(
+                self.is_exact(left[k], right[k], left_path_node.child(k), right_path_node.child(k), up=level)
+                for k in left
+            )
+
+        if handler == self.compare_list:
+            if len(left) != len(right):
+                return False
+            level = TreeLevel(left=left, right=right, up=up, left_path_node=left_path_node,
+                              right_path_node=right_path_node)
+            if not self.ignore_order_func(level, True):
+                # with order: every pair of items of the same index has to be matched by LCS
+                return all(
+                    self.is_exact(left[i], right[i], left_path_node.child(i), right_path_node.child(i), up=level)
+                    for i in range(len(left))
+                )
+
+            # without order: the same greedy matching as compare_list_without_order
+            score_matrix = ListScoreMatrix(self, level)
+            matched_right = {}
+            for li in range(len(left)):
+                ri = score_matrix.find_first_equal(li, matched_right)
+                if ri is None:
+                    return False
+                matched_right[ri] = True
+            return True
+
+        return self.score(left, right, left_path_node, right_path_node, up) == 1
+
+    def get_cache_stats(self) -> Union[Dict[str, int], None]:
+        """Get counters of the score cache
+
+        Returns:
+            A dict of hits, misses, evictions and size; None if the cache is not used
+        """
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def get_content_cache_stats(self) -> Union[Dict[str, int], None]:
+        """Get counters of the cache of drill scores shared by the same pair of contents at different paths
+
+        A miss of the score cache is looked up in the content cache before it is scored, so hits are the drill
+        scores saved. Pairs of values which can not be shared are not counted.
+
+        Returns:
+            A dict of hits, misses, evictions and size; None if the content cache is not used
+        """
+        if self.content_cache is None:
+            return None
+        return self.content_cache.stats()
+
+    @staticmethod
+    def is_join_operator(operator: BaseOperator) -> bool:
+        """Whether an operator declares a join key for items of arrays without order
+
+        """
+        return type(operator).join_key is not BaseOperator.join_key
+
+    def _is_tainted(self, value, path_node: PathNode) -> bool:
+        return type(value) in self._handler_types or len(self.operator_dispatcher.match_path(path_node)) > 0
+
+    def build_fingerprint_index(self):
+        """Fingerprint both jsons so that identical subtrees can be skipped
+
+        Subtrees where a custom operator may match or holding a value of a type given to type_handlers are never
+        skipped. If any operator overrides `match`, or a subclass overrides a compare method, there is no way to tell
+        and nothing will be skipped.
+
+        """
+        if self._compare_overridden:
+            self.fingerprint_index = None
+            return
+
+        is_tainted = None
+        if len(self.custom_operators) > 0:
+            if any(type(operator).match is not BaseOperator.match for operator in self.custom_operators):
+                self.fingerprint_index = None
+                return
+            is_tainted = self._is_tainted
+        if len(self._handler_types) > 0:
+            is_tainted = self._is_tainted
+
+        self.fingerprint_index = FingerprintIndex(self.left, self.right, is_tainted=is_tainted,
+                                                  path_registry=self.path_registry)
+
     def diff(self):
         """Entry function to be called to diff
 
         """
-        root_level = TreeLevel(left=self.left, right=self.right, left_path=[], right_path=[], up=None)
-        return self.diff_level(level=root_level, drill=False) == 1
+        if self.use_fingerprint:
+            self.build_fingerprint_index()
+
+        root_level = TreeLevel(left=self.left, right=self.right, up=None,
+                               left_path_node=self.path_registry.root, right_path_node=self.path_registry.root)
+        try:
+            return self.diff_level(level=root_level, drill=False) == 1
+        finally:
+            if self.parallel_executor is not None:
+                self.parallel_executor.shutdown()
 
-    def get_diff(self, no_pairs=False):
+    def get_diff(self, no_pairs=False, max_value_size: Union[int, None] = None):
         """Do the diff and return the json diff
 
         Normally to_dict is enough to collect all the info.
 
         Args:
             no_pairs: boolean to decide whether to report pairs of json path
+            max_value_size: see to_dict
 
         Returns:
             a dict
         """
         self.diff()
-        return self.to_dict(no_pairs)
+        return self.to_dict(no_pairs, max_value_size)
@@ -1,7 +1,45 @@
 # from: https://github.com/mayorx/hungarian-algorithm
 
+from typing import Dict, List, Tuple
+
 import numpy as np
 
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # pragma: no cover
+    linear_sum_assignment = None
+
+ASSIGNMENT_ENGINE_KM = "km"
+ASSIGNMENT_ENGINE_LAPJV = "lapjv"
+ASSIGNMENT_ENGINES = [ASSIGNMENT_ENGINE_KM, ASSIGNMENT_ENGINE_LAPJV]
+
+
+def collect_pairs(weights: np.ndarray, xy: np.ndarray, reverted: bool, verbose=False) -> Tuple[float, List]:
+    """Turn the matched column of every row into the result of solve()
+
+    Args:
+        weights: n x m weight matrix, n <= m
+        xy: the matched column of every row
+        reverted: whether weights is the transposition of the original one
+        verbose: print every match
+
+    Returns:
+        (total weight, list of (row, column) of the original weight matrix)
+    """
+    sum_ = 0.
+    pairs = []
+    for x in range(weights.shape[0]):
+        if verbose:
+            print('match {} to {}, weight {:.4f}'.format(x, xy[x], weights[x, xy[x]]))
+        pairs.append((x, xy[x]))
+        sum_ += weights[x, xy[x]]
+    if verbose:
+        print('ans: {:.4f}'.format(sum_))
+
+    if reverted:
+        return sum_, [(y, x) for x, y in pairs]
+    return sum_, pairs
+
 
 # max weight assignment
 class KMMatcher:
@@ -95,19 +133,8 @@ class KMMatcher:
             x, y = self.find_augment_path()
             self.do_augment(x, y)
 
-        sum_ = 0.
-        pairs = []
-        for x in range(self.n):
-            if verbose:
-                print('match {} to {}, weight {:.4f}'.format(x, self.xy[x], self.weights[x, self.xy[x]]))
-            pairs.append((x, self.xy[x]))
-            sum_ += self.weights[x, self.xy[x]]
+        sum_, pairs = collect_pairs(self.weights, self.xy, self.reverted, verbose)
         self.best = sum_
-        if verbose:
-            print('ans: {:.4f}'.format(sum_))
-
-        if self.reverted:
-            return sum_, [(y, x) for x, y in pairs]
         return sum_, pairs
 
     def add_to_tree(self, x, prevx):
@@ -126,6 +153,208 @@ class KMMatcher:
         self.slack[np.logical_not(self.T)] -= delta
 
 
+class LAPJVMatcher:
+    """Max weight assignment with the shortest augmenting path algorithm of Jonker-Volgenant
+
+    Same contract as KMMatcher. Rows are assigned one by one, each by a Dijkstra-like search over all columns done
+    with numpy, so there are far fewer python steps than in KMMatcher.
+    scipy.optimize.linear_sum_assignment does the same in C and is used instead if scipy is installed.
+
+    Args:
+        weights: n x m weight matrix
+        use_scipy: use scipy if it is installed
+    """
+
+    def __init__(self, weights, use_scipy=True):
+        weights = np.array(weights, dtype=np.float64)
+        n, m = weights.shape
+
+        self.reverted = False
+        if n > m:
+            self.reverted = True
+            weights = weights.transpose()
+            n, m = m, n
+
+        self.weights = weights
+        self.n, self.m = n, m
+        self.use_scipy = use_scipy and linear_sum_assignment is not None
+
+        self.xy = -np.ones((self.n,), dtype=int)
+
+    def assign(self):
+        """Find the min cost assignment of cost = -weights
+
+        See "On implementing 2D rectangular assignment algorithms" by D. F. Crouse.
+
+        """
+        cost = -self.weights
+        n, m = self.n, self.m
+
+        u = np.zeros((n,), dtype=np.float64)
+        v = np.zeros((m,), dtype=np.float64)
+        row4col = -np.ones((m,), dtype=int)
+        col4row = self.xy
+
+        for cur_row in range(n):
+            shortest = np.full((m,), np.inf)
+            path = -np.ones((m,), dtype=int)
+            visited_rows = np.zeros((n,), dtype=bool)
+            visited_cols = np.zeros((m,), dtype=bool)
+
+            min_value, i, sink = 0., cur_row, -1
+            while sink == -1:
+                visited_rows[i] = True
+
+                reduced = min_value + cost[i] - u[i] - v
+                better = ~visited_cols & (reduced < shortest)
+                path[better] = i
+                shortest[better] = reduced[better]
+
+                candidates = np.where(visited_cols, np.inf, shortest)
+                min_value = candidates.min()
+                ties = np.flatnonzero(candidates == min_value)
+                # prefer a free column to stop as early as possible
+                free = ties[row4col[ties] == -1]
+                j = free[0] if len(free) > 0 else ties[0]
+
+                visited_cols[j] = True
+                if row4col[j] == -1:
+                    sink = j
+                else:
+                    i = row4col[j]
+
+            # update dual variables
+            u[cur_row] += min_value
+            visited_rows[cur_row] = False
+            u[visited_rows] += min_value - shortest[col4row[visited_rows]]
+            v[visited_cols] -= min_value - shortest[visited_cols]
+
+            # augment along the path
+            j = sink
+            while True:
+                i = path[j]
+                row4col[j] = i
+                col4row[i], j = j, col4row[i]
+                if i == cur_row:
+                    break
+
+    def solve(self, verbose=False):
+        if self.use_scipy:
+            _, self.xy = linear_sum_assignment(self.weights, maximize=True)
+        else:
+            self.assign()
+
+        sum_, pairs = collect_pairs(self.weights, self.xy, self.reverted, verbose)
+        self.best = sum_
+        return sum_, pairs
+
+
+def connected_components(weights: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Split the bipartite graph of nonzero weights into connected components
+
+    Rows and columns without any nonzero weight are in no component.
+
+    Args:
+        weights: n x m weight matrix
+
+    Returns:
+        (rows, columns) of every component, sorted by their first row
+    """
+    n, m = weights.shape
+    nonzero = weights != 0
+    if nonzero.all(axis=1).any() or nonzero.all(axis=0).any():
+        # a row (or column) linked to every column (or row) connects every row and column of nonzero weights
+        return [(np.flatnonzero(nonzero.any(axis=1)), np.flatnonzero(nonzero.any(axis=0)))]
+
+    xs, ys = np.nonzero(nonzero)
+    us, vs = xs, ys + n
+
+    # rows are nodes 0..n-1 and columns are nodes n..n+m-1; every node points to a smaller or the same node
+    # roots of both ends of every edge are hooked to the smaller one, then paths are compressed, until edges are inside
+    labels = np.arange(n + m)
+    while True:
+        roots_u, roots_v = labels[us], labels[vs]
+        if np.array_equal(roots_u, roots_v):
+            break
+        lowest = np.minimum(roots_u, roots_v)
+        np.minimum.at(labels, roots_u, lowest)
+        np.minimum.at(labels, roots_v, lowest)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+    labels = labels.tolist()
+    members: Dict[int, Tuple[List[int], List[int]]] = {}
+    for x in np.unique(xs).tolist():
+        members.setdefault(labels[x], ([], []))[0].append(x)
+    for y in np.unique(ys).tolist():
+        members[labels[n + y]][1].append(y)
+
+    return [(np.array(rows), np.array(columns)) for rows, columns in members.values()]
+
+
+class ComponentMatcher:
+    """Max weight assignment solved on every connected component of nonzero weights independently
+
+    Items of arrays without order are mostly similar to a few others only, so the one big assignment falls apart into
+    many small ones; 1 x 1 components are matched directly.
+    Same contract as KMMatcher except that rows or columns without any nonzero weight are left unmatched.
+    The total weight is the same as that of matcher on the whole table, but among equally good matchings the one
+    found may be different.
+
+    Args:
+        weights: n x m weight matrix
+        matcher: the matcher class solving every component
+    """
+
+    def __init__(self, weights, matcher=KMMatcher):
+        self.weights = np.array(weights, dtype=np.float64)
+        self.matcher = matcher
+        self.components = connected_components(self.weights)
+
+    def component_stats(self) -> Dict[str, int]:
+        """Get the number and sizes of components
+
+        Returns:
+            A dict of components, trivial (1 x 1) components and the max rows and columns of a component
+        """
+        return {
+            "components": len(self.components),
+            "trivial": sum(1 for rows, columns in self.components if len(rows) == 1 and len(columns) == 1),
+            "max_rows": max((len(rows) for rows, _ in self.components), default=0),
+            "max_columns": max((len(columns) for _, columns in self.components), default=0)
+        }
+
+    def solve(self, verbose=False):
+        pairs = []
+        for rows, columns in self.components:
+            if len(rows) == 1 and len(columns) == 1:
+                pairs.append((rows[0], columns[0]))
+                continue
+            if len(rows) == self.weights.shape[0] and len(columns) == self.weights.shape[1]:
+                weights = self.weights
+            else:
+                weights = self.weights[np.ix_(rows, columns)]
+            _, component_pairs = self.matcher(weights).solve(verbose=verbose)
+            pairs.extend((rows[x], columns[y]) for x, y in component_pairs)
+
+        # same order as the pairs of one assignment
+        n, m = self.weights.shape
+        pairs.sort(key=lambda pair: pair[1] if n > m else pair[0])
+        pairs = [(int(x), int(y)) for x, y in pairs]
+
+        self.best = sum(self.weights[x, y] for x, y in pairs)
+        return self.best, pairs
+
+
+MATCHERS = {
+    ASSIGNMENT_ENGINE_KM: KMMatcher,
+    ASSIGNMENT_ENGINE_LAPJV: LAPJVMatcher
+}
+
+
 if __name__ == '__main__':
     matcher = KMMatcher([
         [2., 3., 0., 3.],
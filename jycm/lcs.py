@@ -0,0 +1,96 @@
+from typing import Callable, List, Tuple
+
+
+def _middle_snake(x0: int, x1: int, y0: int, y1: int,
+                  is_equal: Callable[[int, int], bool]) -> Tuple[int, int, int, int]:
+    """Find the middle snake of left[x0:x1] and right[y0:y1]
+
+    Forward and reverse furthest reaching D-paths are extended alternately until they overlap,
+    only two arrays of size O(N+M) are needed.
+
+    Returns:
+        Start and end of the snake (x_start, y_start, x_end, y_end)
+    """
+    n, m = x1 - x0, y1 - y0
+    delta = n - m
+    odd = delta % 2 != 0
+    max_d = (n + m + 1) // 2
+
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and is_equal(x0 + x, y0 + y):
+                x, y = x + 1, y + 1
+            forward[offset + k] = x
+
+            # reverse diagonal of k is delta - k
+            if odd and delta - (d - 1) <= k <= delta + (d - 1) and x + backward[offset + delta - k] >= n:
+                return x0 + start_x, y0 + start_y, x0 + x, y0 + y
+
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            start_x, start_y = x, y
+            while x < n and y < m and is_equal(x1 - x - 1, y1 - y - 1):
+                x, y = x + 1, y + 1
+            backward[offset + k] = x
+
+            if not odd and -d <= delta - k <= d and x + forward[offset + delta - k] >= n:
+                return x1 - x, y1 - y, x1 - start_x, y1 - start_y
+
+    raise RuntimeError("middle snake not found")  # pragma: no cover
+
+
+def myers_lcs(left_size: int, right_size: int, is_equal: Callable[[int, int], bool]) -> List[Tuple[int, int]]:
+    """Longest common subsequence with Myers' O(ND) algorithm in linear space
+
+    The cost scales with the number of differences D instead of left_size * right_size.
+    Sub problems are kept in an explicit stack so long arrays will not hit the recursion limit.
+
+    Args:
+        left_size: size of the left array
+        right_size: size of the right array
+        is_equal: (left_index, right_index) => bool
+
+    Returns:
+        Sorted list of (left_index, right_index) of the LCS
+    """
+    pairs = []
+    stack = [(0, left_size, 0, right_size)]
+
+    while len(stack) > 0:
+        x0, x1, y0, y1 = stack.pop()
+
+        # common prefix and suffix are always part of the LCS
+        while x0 < x1 and y0 < y1 and is_equal(x0, y0):
+            pairs.append((x0, y0))
+            x0, y0 = x0 + 1, y0 + 1
+
+        while x0 < x1 and y0 < y1 and is_equal(x1 - 1, y1 - 1):
+            x1, y1 = x1 - 1, y1 - 1
+            pairs.append((x1, y1))
+
+        if x0 == x1 or y0 == y1:
+            continue
+
+        start_x, start_y, end_x, end_y = _middle_snake(x0, x1, y0, y1, is_equal)
+        for i in range(end_x - start_x):
+            pairs.append((start_x + i, start_y + i))
+
+        stack.append((x0, start_x, y0, start_y))
+        stack.append((end_x, x1, end_y, y1))
+
+    pairs.sort()
+    return pairs
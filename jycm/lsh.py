@@ -0,0 +1,115 @@
+import zlib
+from typing import Any, List, Tuple, Union
+
+import numpy as np
+
+# 2 ** 31 - 1; a * x + b stays in uint64 for a, x < 2 ** 32
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _normalize_leaf(value) -> str:
+    # 1 == 1.0 == True for compare_primitive
+    if type(value) == bool or type(value) == int:
+        return repr(int(value))
+    if type(value) == float and value.is_integer():
+        return repr(int(value))
+    return repr(value)
+
+
+def leaf_tokens(value) -> List[str]:
+    """Flatten a value into tokens of (path, leaf value)
+
+    Indices of arrays are dropped from paths so that tokens do not depend on the order of arrays.
+
+    Args:
+        value: a json value
+
+    Returns:
+        Tokens of every leaf; empty dicts and arrays are leaves too
+    """
+    tokens = []
+    stack: List[Tuple[Any, str]] = [(value, "")]
+    while len(stack) > 0:
+        current, path = stack.pop()
+        if isinstance(current, dict) and len(current) > 0:
+            for k, v in current.items():
+                stack.append((v, f"{path}->{k}"))
+        elif isinstance(current, (list, tuple)) and len(current) > 0:
+            for v in current:
+                stack.append((v, f"{path}->[]"))
+        else:
+            tokens.append(f"{path}={_normalize_leaf(current)}")
+    return tokens
+
+
+class MinHashLSH:
+    """Find candidate pairs of similar items by MinHash and locality sensitive hashing
+
+    Items are flattened into leaf tokens, items sharing many tokens are likely to be diffed to a high score.
+    The signature of num_perm min hashes is split into bands; two items become a candidate pair if all hashes of
+    any band are the same. Items whose Jaccard similarity of tokens is s are found with probability
+    1 - (1 - s ** rows) ** bands, where rows = num_perm / bands.
+
+    Args:
+        num_perm: number of hash functions
+        bands: number of bands; more bands find more pairs (recall) but score more pairs (speed)
+        min_pairs: lists with fewer pairs of items than this are scored exhaustively
+        seed: seed of hash functions
+    """
+
+    def __init__(self, num_perm=128, bands=32, min_pairs=10000, seed=0):
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm=[{num_perm}] should be a multiple of bands=[{bands}]")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_pairs = min_pairs
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, value) -> np.ndarray:
+        """MinHash signature of a value
+
+        Args:
+            value: a json value
+
+        Returns:
+            An array of num_perm hashes
+        """
+        tokens = np.array([zlib.crc32(t.encode("utf-8")) for t in set(leaf_tokens(value))], dtype=np.uint64)
+        hashes = (tokens[:, None] * self._a[None, :] + self._b[None, :]) % np.uint64(_MERSENNE_PRIME)
+        return hashes.min(axis=0)
+
+    def candidate_pairs(self, left: List, right: List) -> Union[List[Tuple[int, int]], None]:
+        """Find pairs of items that are likely to be similar
+
+        Args:
+            left: left items
+            right: right items
+
+        Returns:
+            Sorted (left_index, right_index) pairs; None if the lists are small enough to score every pair
+        """
+        if len(left) * len(right) < self.min_pairs:
+            return None
+
+        left_signatures = [self.signature(v) for v in left]
+        right_signatures = [self.signature(v) for v in right]
+
+        pairs = set()
+        for band in range(self.bands):
+            start, end = band * self.rows, (band + 1) * self.rows
+            buckets = {}
+            for li, signature in enumerate(left_signatures):
+                key = signature[start:end].tobytes()
+                if key not in buckets:
+                    buckets[key] = []
+                buckets[key].append(li)
+
+            for ri, signature in enumerate(right_signatures):
+                for li in buckets.get(signature[start:end].tobytes(), []):
+                    pairs.add((li, ri))
+
+        return sorted(pairs)
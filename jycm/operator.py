@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import TYPE_CHECKING, Tuple, Type
+from typing import TYPE_CHECKING, Any, Hashable, List, Tuple, Type, Union
 
 from jycm.common import PLACE_HOLDER_NON_EXIST
 
@@ -22,6 +22,45 @@ class BaseOperator:
     def diff(self, level: 'TreeLevel', instance, drill: bool) -> Tuple[bool, float]:
         raise NotImplementedError
 
+    def join_key(self, value) -> Union[Hashable, None]:
+        """Key to pair items of arrays without order by
+
+        Override this to declare that items matched by this operator are diffed to 1 in drill mode if and only if their
+        keys are equal; the differ then pairs items by a hash index of keys instead of diffing every pair.
+        Only operators which do not override `match` are considered, and only where no other operator matches the items.
+        If any item of the right array has no key, every pair is diffed.
+
+        Args:
+            value: an item of an array
+
+        Returns:
+            The key of the item or None if it has no key
+        """
+        return None
+
+    def join_key_paths(self) -> Union[List[List], None]:
+        """Paths inside an item of the values its join key is made of
+
+        Override this if the operator only decides that items with equal keys are diffed to 1 and leaves the others to
+        the differ; the differ then only uses keys of items whose values at these paths are hashable primitive values
+        reached through dicts, which nothing but compare_primitive diffs.
+
+        Returns:
+            A list of paths, or None if items with different keys are never diffed to 1 by the operator itself
+        """
+        return None
+
+
+def to_hashable(value) -> Hashable:
+    """Turn a json value into a hashable one; equal values are turned into equal ones
+
+    """
+    if isinstance(value, dict):
+        return frozenset((k, to_hashable(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(to_hashable(v) for v in value)
+    return value
+
 
 OPERATOR_DICT = {}
 
@@ -53,17 +92,56 @@ def get_operator(name: str):
 
 @register_operator
 class ListItemFieldMatchOperator(BaseOperator):
+    """Match items of arrays by fields
+
+    Items with the same fields are diffed to 1 in drill mode, and items of arrays without order are paired by a hash
+    index of the fields where they are primitive values; see BaseOperator.join_key_paths.
+
+    Args:
+        path_regex: regex of paths of items
+        field: a key, or a list of keys (or list of keys and indices for a nested field) for a composite key.
+            For example "id", ["id", "version"] or [["meta", "id"], "version"]
+    """
     __operator_name__ = "operator:list:matchWithField"
     __event__ = "operator:list:matchWithField"
 
-    def __init__(self, path_regex, field):
+    def __init__(self, path_regex, field: Union[Any, List[Union[Any, List]]]):
         super().__init__(path_regex=path_regex)
         self.field = field
 
+        if isinstance(field, list):
+            self.field_paths = [f if isinstance(f, list) else [f] for f in field]
+        else:
+            self.field_paths = [[field]]
+
+    def get_field_values(self, value) -> List:
+        """Values of the fields of an item
+
+        Raises:
+            KeyError, IndexError or TypeError if the item has no such field
+        """
+        values = []
+        for field_path in self.field_paths:
+            current = value
+            for key in field_path:
+                current = current[key]
+            values.append(current)
+        return values
+
+    def join_key(self, value) -> Union[Hashable, None]:
+        try:
+            return to_hashable(self.get_field_values(value))
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    def join_key_paths(self) -> Union[List[List], None]:
+        # items with different fields are left to the differ, e.g. fields of arrays ignoring order
+        return self.field_paths
+
     def diff(self, level: 'TreeLevel', instance: 'YouchamaJsonDiffer', drill: bool) -> Tuple[bool, float]:
         if drill:
             # 演习的比较
-            if level.left[self.field] == level.right[self.field]:
+            if self.get_field_values(level.left) == self.get_field_values(level.right):
                 return True, 1
         else:
             instance.report(self.__event__, level, {"field": self.field, "path_regex": self.path_regex})
@@ -0,0 +1,171 @@
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, List, Tuple, Union
+
+if TYPE_CHECKING:
+    from jycm.jycm import Record, YouchamaJsonDiffer
+
+# the differ of a worker process, built once by _init_worker
+_worker_differ: Union['YouchamaJsonDiffer', None] = None
+
+
+def _init_worker(payload: bytes):
+    global _worker_differ
+    differ_class, options, left, right = pickle.loads(payload)
+    _worker_differ = differ_class(left, right, **options)
+    # a cache given to the differ comes with the entries of the parent, whose path ids mean nothing here
+    for cache in [_worker_differ.cache, _worker_differ.content_cache]:
+        if cache is not None:
+            cache.clear()
+    if _worker_differ.use_fingerprint:
+        _worker_differ.build_fingerprint_index()
+
+
+def _diff_subtrees(left_path: List, right_path: List, keys: List) -> List[Tuple[float, List[Tuple]]]:
+    return _worker_differ.diff_subtrees(left_path, right_path, keys)
+
+
+# no value at a path
+_MISSING = object()
+
+
+def _value_at(root, path: List):
+    value = root
+    try:
+        for k in path:
+            value = value[k]
+    except (KeyError, IndexError, TypeError):
+        return _MISSING
+    return value
+
+
+def pack_record(record: 'Record', left, right) -> Tuple:
+    """Pack a record of a worker to be sent back
+
+    Values which are the values at their paths of the jsons are not sent; see unpack_value.
+
+    Args:
+        record: the record
+        left: the left json of the worker
+        right: the right json of the worker
+
+    Returns:
+        (event, left path, right path, packed left, packed right, info)
+    """
+    level = record.level
+    left_path, right_path = level.left_path, level.right_path
+    packed_left = None if _value_at(left, left_path) is level.left else (level.left,)
+    packed_right = None if _value_at(right, right_path) is level.right else (level.right,)
+    return record.event, left_path, right_path, packed_left, packed_right, record.info
+
+
+def unpack_value(packed: Union[Tuple, None], root, path: List):
+    """Value of a record packed by pack_record
+
+    Args:
+        packed: the packed value; None if it is the value at path of root
+        root: the json of the side
+        path: the path of the side
+
+    Returns:
+        The value
+    """
+    if packed is None:
+        return _value_at(root, path)
+    return packed[0]
+
+
+def count_values(value, limit: int) -> int:
+    """Number of values (dicts, arrays and primitives) inside a value, counted up to limit
+
+    """
+    count, stack = 0, [value]
+    while len(stack) > 0 and count < limit:
+        current = stack.pop()
+        count += 1
+        current_type = type(current)
+        if current_type == dict:
+            stack.extend(current.values())
+        elif current_type == list or current_type == tuple:
+            stack.extend(current)
+    return count
+
+
+class ProcessPoolDiffExecutor:
+    """Diff big independent subtrees in worker processes
+
+    In the report phase, values of the keys of the root dicts and items of arrays compared index by index
+    (fast_mode) are diffed independently of each other. Those of at least min_size values are diffed by a
+    ProcessPoolExecutor while the differ goes on with the others, and their records and scores are merged in
+    the order of a sequential diff, so the result is the same.
+    Consecutive smaller items of an array are diffed together once they add up to min_size values.
+
+    The pool is started on the first subtree big enough and shut down at the end of the diff.
+    The class and options of the differ and both jsons are pickled once and shipped to every worker when it starts.
+    If they can not be pickled, e.g. an ignore_order_func made by lambda, everything is diffed in process.
+
+    Args:
+        max_workers: number of worker processes; default os.cpu_count()
+        min_size: least number of values of a subtree, counting both sides, to be diffed by a worker
+        mp_context: multiprocessing context of the pool; default the one of ProcessPoolExecutor
+    """
+
+    def __init__(self, max_workers: Union[int, None] = None, min_size=10000, mp_context=None):
+        self.max_workers = max_workers
+        self.min_size = min_size
+        self.mp_context = mp_context
+
+        self._pool: Union[ProcessPoolExecutor, None] = None
+        self._futures: List[Future] = []
+        # None if the differ is not pickled yet, False if it can not be
+        self._payload: Union[bytes, bool, None] = None
+
+    def start(self, differ: 'YouchamaJsonDiffer', options: dict) -> bool:
+        """Start the pool for a differ if it is not started yet
+
+        Args:
+            differ: the differ
+            options: keyword arguments to build the same differ in workers
+
+        Returns:
+            False if the differ can not be shipped to workers
+        """
+        if self._payload is None:
+            try:
+                self._payload = pickle.dumps((type(differ), options, differ.left, differ.right))
+            except (pickle.PicklingError, AttributeError, TypeError):
+                self._payload = False
+        if self._payload is False:
+            return False
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self.mp_context,
+                                             initializer=_init_worker, initargs=(self._payload,))
+        return True
+
+    def submit(self, left_path: List, right_path: List, keys: List[Any]) -> Future:
+        """Diff children of a level by keys in a worker; see YouchamaJsonDiffer.diff_subtrees
+
+        Args:
+            left_path: left path of the level
+            right_path: right path of the level
+            keys: keys of the children
+
+        Returns:
+            A future of [(score, packed records)] of every key
+        """
+        future = self._pool.submit(_diff_subtrees, left_path, right_path, keys)
+        self._futures.append(future)
+        return future
+
+    def shutdown(self):
+        """Stop the pool and forget the differ
+
+        """
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self._pool = None
+        self._payload = None
@@ -0,0 +1,116 @@
+from typing import Any, Dict, List, Union
+
+
+class PathNode:
+    """An interned json path
+
+    A path is stored as its parent path plus the last key or index. Every path is represented by exactly one node
+    of a PathRegistry, so paths can be compared and hashed by identity / integer id instead of string keys.
+
+    Args:
+        registry: the registry this node belongs to
+        parent: the parent path; None for the root, i.e. the empty path
+        segment: the last key or index of the path
+    """
+    __slots__ = ("registry", "parent", "segment", "id", "children")
+
+    def __init__(self, registry: 'PathRegistry', parent: Union['PathNode', None], segment: Any):
+        self.registry = registry
+        self.parent = parent
+        self.segment = segment
+        self.id: int = registry.size
+        registry.size += 1
+
+        self.children: Union[Dict[Any, 'PathNode'], None] = None
+
+    def child(self, segment) -> 'PathNode':
+        """Get the path of a key or an index under this path
+
+        Args:
+            segment: a dict key or a list index
+
+        Returns:
+            The interned node
+        """
+        if self.children is None:
+            self.children = {}
+        node = self.children.get(segment)
+        if node is None:
+            node = PathNode(self.registry, self, segment)
+            self.children[segment] = node
+        return node
+
+    def to_list(self) -> List:
+        """Materialize the path
+
+        Returns:
+            The path as a list of keys and indices
+        """
+        segments = []
+        node = self
+        while node.parent is not None:
+            segments.append(node.segment)
+            node = node.parent
+        segments.reverse()
+        return segments
+
+    def __repr__(self):  # pragma: no cover
+        return f"PathNode({self.id}, {self.to_list()})"
+
+
+class PathRegistry:
+    """Interns json paths as PathNode
+
+    The left and the right json share one registry so the same path on both sides is the same node.
+
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.root = PathNode(self, None, None)
+
+    def from_list(self, path: List) -> PathNode:
+        """Intern a path given as a list
+
+        Args:
+            path: list of keys and indices
+
+        Returns:
+            The interned node
+        """
+        node = self.root
+        for segment in path:
+            node = node.child(segment)
+        return node
+
+
+class StructuralPaths:
+    """Map paths to their structural paths, i.e. the paths with every array index replaced by 0
+
+    All items of an array share one structural path. Structural paths are interned by a registry of their own.
+
+    """
+
+    def __init__(self):
+        self.registry = PathRegistry()
+        self._nodes: Dict[int, PathNode] = {}
+
+    def get(self, node: PathNode) -> PathNode:
+        """Get the structural path of a path
+
+        Args:
+            node: an interned path
+
+        Returns:
+            The interned structural path
+        """
+        chain = []
+        while node.parent is not None and node.id not in self._nodes:
+            chain.append(node)
+            node = node.parent
+        structural_node = self.registry.root if node.parent is None else self._nodes[node.id]
+
+        for node in reversed(chain):
+            structural_node = structural_node.child(0 if type(node.segment) == int else node.segment)
+            self._nodes[node.id] = structural_node
+        return structural_node
@@ -0,0 +1,202 @@
+import json
+import queue
+from typing import IO, TYPE_CHECKING, Callable, Dict, Iterator, List, Union
+
+from jycm.common import EVENT_PAIR
+
+if TYPE_CHECKING:
+    from jycm.jycm import Record
+
+
+class RecordSink:
+    """Where records go as soon as they are reported
+
+    Extend this class and implement `emit` to stream records somewhere else.
+
+    """
+
+    def emit(self, record: 'Record'):
+        """Receive a reported record
+
+        Args:
+            record: the record
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release anything held by this sink
+
+        """
+        pass
+
+    def to_dict(self, no_pairs=False, max_value_size: Union[int, None] = None) -> dict:
+        """Records are not kept by default
+
+        """
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class MemoryRecordSink(RecordSink):
+    """Keep all records in memory grouped by event; the default sink
+
+    """
+
+    def __init__(self):
+        self.records: Dict[str, List['Record']] = {
+            EVENT_PAIR: []
+        }
+
+    def emit(self, record: 'Record'):
+        if record.event not in self.records:
+            self.records[record.event] = []
+        self.records[record.event].append(record)
+
+    def to_dict(self, no_pairs=False, max_value_size: Union[int, None] = None) -> dict:
+        """Convert all records to a dict
+
+        Args:
+            no_pairs: boolean to decide whether to report pairs of json path
+            max_value_size: see Record.to_dict
+
+        Returns:
+            a dict of event => list of records as dict
+        """
+        total_dict = {}
+        events = list(self.records.keys())
+        events.sort()
+        for event in events:
+            if no_pairs and event == EVENT_PAIR:
+                continue
+            total_dict[event] = [r.to_dict(max_value_size) for r in self.records[event]]
+
+        return total_dict
+
+
+class CallbackRecordSink(RecordSink):
+    """Call a function for every record
+
+    Args:
+        callback: (record: Record) => None
+        no_pairs: whether to drop pairs of json path
+    """
+
+    def __init__(self, callback: Callable[['Record'], None], no_pairs=False):
+        self.callback = callback
+        self.no_pairs = no_pairs
+
+    def emit(self, record: 'Record'):
+        if self.no_pairs and record.event == EVENT_PAIR:
+            return
+        self.callback(record)
+
+
+class NDJSONRecordSink(RecordSink):
+    """Write every record as one line of json
+
+    Each line is the record as dict with an additional "event" field.
+
+    Args:
+        output: a file path or a writable text file
+        no_pairs: whether to drop pairs of json path
+        max_value_size: see Record.to_dict
+    """
+
+    def __init__(self, output: Union[str, IO], no_pairs=False, max_value_size: Union[int, None] = None):
+        if isinstance(output, str):
+            self.fp = open(output, "w")
+            self.own_fp = True
+        else:
+            self.fp = output
+            self.own_fp = False
+        self.no_pairs = no_pairs
+        self.max_value_size = max_value_size
+
+    def emit(self, record: 'Record'):
+        if self.no_pairs and record.event == EVENT_PAIR:
+            return
+        self.fp.write(json.dumps({"event": record.event, **record.to_dict(self.max_value_size)}))
+        self.fp.write("\n")
+
+    def close(self):
+        if self.own_fp:
+            self.fp.close()
+        else:
+            self.fp.flush()
+
+
+class RecordSinkClosed(Exception):
+    """The exception that will be threw when records are emitted to a sink nobody is reading
+
+    """
+    pass
+
+
+class QueueRecordSink(RecordSink):
+    """Hand records over to another thread through a bounded queue
+
+    The producer blocks once max_size records are waiting, so memory stays bounded by the reader's pace.
+
+    Args:
+        max_size: max number of records waiting to be read
+        no_pairs: whether to drop pairs of json path
+    """
+
+    _DONE = object()
+
+    def __init__(self, max_size=1024, no_pairs=False):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.no_pairs = no_pairs
+        self.closed = False
+        self.error: Union[BaseException, None] = None
+
+    def emit(self, record: 'Record'):
+        if self.no_pairs and record.event == EVENT_PAIR:
+            return
+        while True:
+            if self.closed:
+                raise RecordSinkClosed()
+            try:
+                self.queue.put(record, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce(self, func: Callable[[], None]):
+        """Run func in the producer thread and mark the end of records when it returns or fails
+
+        Args:
+            func: the function reporting records to this sink
+        """
+        try:
+            func()
+        except BaseException as e:
+            self.error = e
+
+        while not self.closed:
+            try:
+                self.queue.put(self._DONE, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def close(self):
+        """Stop reading; the producer aborts on its next record
+
+        """
+        self.closed = True
+
+    def __iter__(self) -> Iterator['Record']:
+        while True:
+            record = self.queue.get()
+            if record is self._DONE:
+                break
+            yield record
+
+        if self.error is not None and not self.closed:
+            raise self.error
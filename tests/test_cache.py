@@ -0,0 +1,80 @@
+from jycm.cache import DrillOnlyScoreCache, LRUScoreCache, MaxBytesScoreCache, ScoreCache
+from jycm.jycm import YouchamaJsonDiffer
+
+
+def test_lru_score_cache():
+    cache = LRUScoreCache(max_entries=2)
+    cache.put((0, 0, True), 1)
+    cache.put((1, 1, True), 0.5)
+    assert cache.get((0, 0, True)) == 1
+    cache.put((2, 2, True), 0)
+
+    # (1, 1) is the least recently used one
+    assert (1, 1, True) not in cache
+    assert cache.get((1, 1, True)) is None
+    assert cache.get((2, 2, True)) == 0
+    assert cache.stats() == {"hits": 2, "misses": 1, "evictions": 1, "size": 2}
+
+
+def test_max_bytes_score_cache():
+    entry_size = MaxBytesScoreCache.weigh((0, 0, True), 0.5)
+    cache = MaxBytesScoreCache(max_bytes=entry_size * 3)
+    for i in range(10):
+        cache.put((i, i, True), 0.5)
+    assert len(cache) == 3
+    assert cache.evictions == 7
+    assert cache.size_in_bytes <= cache.max_bytes
+
+    # matchings of arrays are weighed with their indices
+    key = (0, 0, "table", "matching")
+    assert MaxBytesScoreCache.weigh(key, ((0, 0), (1, 2))) > MaxBytesScoreCache.weigh(key, ((0, 0),))
+
+
+def test_drill_only_score_cache():
+    cache = DrillOnlyScoreCache(LRUScoreCache(max_entries=1))
+    cache.put((0, 0, False), 1)
+    cache.put((0, 0, True), 1)
+    cache.put((1, 1, True), 1)
+    assert cache.get((0, 0, False)) is None
+    assert cache.get((1, 1, True)) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "size": 1}
+
+
+def test_differ_with_cache_policies():
+    left = {"a": [{"id": i, "v": [i, i + 1]} for i in range(20)], "b": 1}
+    right = {"a": [{"id": i, "v": [i, i + 2]} for i in reversed(range(20))], "b": 2}
+
+    expected = YouchamaJsonDiffer(left, right, use_cache=False).get_diff()
+    for cache in [ScoreCache(), LRUScoreCache(max_entries=8), MaxBytesScoreCache(max_bytes=4096),
+                  DrillOnlyScoreCache(), DrillOnlyScoreCache(LRUScoreCache(max_entries=1))]:
+        ycm = YouchamaJsonDiffer(left, right, use_cache=cache)
+        assert ycm.get_diff() == expected
+        stats = ycm.get_cache_stats()
+        assert stats["hits"] + stats["misses"] > 0
+
+    assert YouchamaJsonDiffer(left, right, use_cache=False).get_cache_stats() is None
+
+
+def test_replayed_matchings_are_not_counted():
+    class RecordingCache(ScoreCache):
+        def __init__(self):
+            super().__init__()
+            self.keys = []
+
+        def get(self, key):
+            self.keys.append(key)
+            return super().get(key)
+
+    def matching_keys(cache):
+        return [key for key in cache.keys if key[-1] == "matching"]
+
+    # only diffed by the report phase
+    cache = RecordingCache()
+    YouchamaJsonDiffer({"a": list(range(10))}, {"a": [*range(1, 10), 11]}, use_cache=cache).diff()
+    assert matching_keys(cache) == []
+
+    # matched in drill mode and replayed by the report phase
+    cache = RecordingCache()
+    YouchamaJsonDiffer({"a": [{"v": list(range(10))}]}, {"a": [{"v": [*range(1, 10), 11]}]}, use_cache=cache).diff()
+    assert len(matching_keys(cache)) == 1
+    assert cache.peek(matching_keys(cache)[0]) is not None
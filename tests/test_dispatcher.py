@@ -0,0 +1,59 @@
+import random
+
+from jycm.common import PLACE_HOLDER_NON_EXIST
+from jycm.dispatcher import OperatorDispatcher, is_index_agnostic
+from jycm.helper import make_json_path_key
+from jycm.jycm import TreeLevel
+from jycm.operator import BaseOperator, IgnoreOperator
+from jycm.path import PathRegistry
+
+
+def test_is_index_agnostic():
+    for pattern in [r"^v->\[\d+\]$", r"^a->.*->b$", r"^a->[^>]*$", r"\[\d*\]", r"(?i)^a$", r"^(a|b)->\[\d+\]?$"]:
+        assert is_index_agnostic(pattern), pattern
+
+    for pattern in [r"^v->\[0\]$", r".+", r"\w+", r"\d+\d+", r"\bx", r"^a->.$", r"a{2}", r"\[\d\]", r"(a)\1"]:
+        assert not is_index_agnostic(pattern), pattern
+
+
+class EvenIndexOperator(BaseOperator):
+
+    def match(self, level: 'TreeLevel') -> bool:
+        return len(level.left_path) > 0 and type(level.left_path[-1]) == int and level.left_path[-1] % 2 == 0
+
+
+def test_operator_dispatcher():
+    patterns = [
+        r"^v->\[\d+\]$", r"^v->\[1\]->a$", r"->a$", r"^v->\[\d+\]->.*$", r"^v->\[1\d\]", r"^w->\[\d+\]->\[\d+\]$",
+        r"^(v|w)->\[\d+\]->b$", r"\d+\d+", r"\[.\]", r"(?i)^V"
+    ]
+    operators = [IgnoreOperator(p) for p in patterns]
+    operators.insert(3, EvenIndexOperator("^$"))
+    dispatcher = OperatorDispatcher(operators)
+    registry = PathRegistry()
+
+    rng = random.Random(0)
+    for _ in range(2000):
+        path = [rng.choice(["v", "w", "x"])]
+        for _ in range(rng.randint(0, 3)):
+            path.append(rng.choice([rng.randint(0, 120), "a", "b"]))
+
+        level = TreeLevel(left=1, right=1, left_path=path, right_path=path, up=None)
+        node = registry.from_list(path)
+        expected = [operator for operator in operators if operator.match(level)]
+        assert list(dispatcher.match(level, node, node)) == expected, make_json_path_key(path)
+
+        # the right path is matched if the left side does not exist
+        level = TreeLevel(left=PLACE_HOLDER_NON_EXIST, right=1, left_path=[], right_path=path, up=None)
+        expected = [operator for operator in operators if operator.match(level)]
+        assert list(dispatcher.match(level, registry.root, node)) == expected, make_json_path_key(path)
+
+
+def test_operator_dispatcher_may_match():
+    registry = PathRegistry()
+    node = registry.from_list(["v", 3, "a"])
+
+    assert not OperatorDispatcher([]).may_match(node)
+    assert OperatorDispatcher([IgnoreOperator(r"^v->\[\d+\]->a$")]).may_match(node)
+    assert not OperatorDispatcher([IgnoreOperator(r"^v->\[\d+\]->b$")]).may_match(node)
+    assert OperatorDispatcher([EvenIndexOperator("^$")]).may_match(node)
@@ -1,5 +1,9 @@
-from jycm.helper import render_to_html
-from jycm.jycm import YouchamaJsonDiffer
+import json
+import pickle
+
+from jycm.common import PLACE_HOLDER_NON_EXIST
+from jycm.helper import make_ignore_order_func, make_value_ref, render_to_html, resolve_value_ref
+from jycm.jycm import TreeLevel, YouchamaJsonDiffer
 
 expected_html_code = """<!doctype html>
 <html lang="en">
@@ -58,3 +62,90 @@ def test_html_dump():
     ycm.diff()
 
     assert expected_html_code == render_to_html(left, right, ycm.to_dict())
+
+
+def test_value_ref():
+    left = {"big": {"values": list(range(100))}, "small": [1]}
+    right = {}
+
+    assert make_value_ref(left["small"], "left", ["small"], 10) == [1]
+
+    ref = make_value_ref(left["big"], "left", ["big"], 10, preview_size=8)
+    assert ref == {"__REF__": "left", "path": ["big"], "preview": '{"values...'}
+    assert resolve_value_ref(left, right, ref) is left["big"]
+    assert resolve_value_ref(left, right, [1]) == [1]
+
+
+def test_value_ref_lookalike():
+    left = {"a": {"__REF__": "x"}, "b": {"__REF__": "right", "path": ["b"]}, "c": 1}
+    right = {"a": {"__REF__": "y"}, "b": {"__REF__": "left", "path": ["c"]}, "c": 2}
+
+    for value in [left["a"], left["b"], {"__REF__": "left", "path": "c", "preview": ""}]:
+        assert resolve_value_ref(left, right, value) is value
+
+    ycm = YouchamaJsonDiffer(left, {})
+    removed = ycm.get_diff(no_pairs=True, max_value_size=100)["dict:remove"]
+    assert [record["left"] for record in removed] == [left["a"], left["b"], 1]
+    # values of the json which look like references are kept as they are
+    assert [ycm.resolve_value(record["left"]) for record in removed] == [left["a"], left["b"], 1]
+
+
+def test_value_ref_of_value_shaped_like_ref():
+    left = {"a": {"__REF__": "right", "path": ["b"], "preview": "2"}}
+    right = {"b": 2}
+
+    ref = make_value_ref(left["a"], "left", ["a"], 100)
+    assert ref == {"__REF__": "left", "path": ["a"], "preview": json.dumps(left["a"]) + "..."}
+    assert resolve_value_ref(left, right, ref) is left["a"]
+
+    ycm = YouchamaJsonDiffer(left, right)
+    removed = ycm.get_diff(no_pairs=True, max_value_size=100)["dict:remove"]
+    assert [ycm.resolve_value(record["left"]) for record in removed] == [left["a"]]
+
+
+def test_to_dict_with_max_value_size():
+    left = {"big": {"values": list(range(100))}, "s": "x" * 20, "n": 1}
+    right = {"s": "y", "n": 2}
+
+    ycm = YouchamaJsonDiffer(left, right)
+    result = ycm.get_diff(no_pairs=True, max_value_size=10)
+    assert result == {
+        'dict:remove': [
+            {'left': {'__REF__': 'left', 'path': ['big'], 'preview': json.dumps(left["big"])[:64] + '...'},
+             'right': '__NON_EXIST__', 'left_path': 'big', 'right_path': ''}
+        ],
+        'value_changes': [
+            {'left': 1, 'right': 2, 'left_path': 'n', 'right_path': 'n', 'old': 1, 'new': 2},
+            {'left': {'__REF__': 'left', 'path': ['s'], 'preview': '"xxxxxxxxxxxxxxxxxxxx"...'}, 'right': 'y',
+             'left_path': 's', 'right_path': 's',
+             'old': {'__REF__': 'left', 'path': ['s'], 'preview': '"xxxxxxxxxxxxxxxxxxxx"...'}, 'new': 'y'}
+        ]
+    }
+    assert ycm.resolve_value(result["dict:remove"][0]["left"]) is left["big"]
+    assert ycm.to_dict(no_pairs=True) == YouchamaJsonDiffer(left, right).get_diff(no_pairs=True)
+
+
+def test_ignore_order_func():
+    ignore_order_func = make_ignore_order_func([r"^s$", r"^s->\[\d+\]$", r"->tags$"])
+    assert ignore_order_func.index_agnostic
+    assert ignore_order_func.combined is not None
+
+    paths = [["s"], ["s", 0], ["s", 12], ["s", 12, 3], ["t", 1, "tags"], ["t"], ["s", 3, "tags"]]
+    expected = [True, True, True, False, True, False, True]
+    for _ in range(2):
+        for path, decision in zip(paths, expected):
+            level = TreeLevel(left=[], right=[], left_path=path, right_path=path, up=None)
+            assert ignore_order_func(level, False) == decision
+    # ["s", 0] and ["s", 12] share one decision
+    assert ignore_order_func.stats() == {"hits": 8, "misses": 6, "size": 6}
+
+    # the right path is used if the left side does not exist
+    level = TreeLevel(left=PLACE_HOLDER_NON_EXIST, right=[], left_path=[], right_path=["s"], up=None)
+    assert ignore_order_func(level, False)
+
+    ignore_order_func = pickle.loads(pickle.dumps(make_ignore_order_func([r"^s->\[1\]$"])))
+    assert not ignore_order_func.index_agnostic
+    assert ignore_order_func(TreeLevel(left=[], right=[], left_path=["s", 1], right_path=["s", 1], up=None), False)
+    assert not ignore_order_func(TreeLevel(left=[], right=[], left_path=["s", 0], right_path=["s", 0], up=None), False)
+    # paths which tell indices apart are not memoized
+    assert ignore_order_func.stats() == {"hits": 0, "misses": 0, "size": 0}
@@ -1,6 +1,10 @@
+import copy
+import random
+
 from jycm.helper import make_ignore_order_func
-from jycm.jycm import YouchamaJsonDiffer
-from jycm.operator import ListItemFieldMatchOperator
+from jycm.jycm import DiffLevelException, ListItemPair, ListScoreMatrix, TreeLevel, YouchamaJsonDiffer
+from jycm.operator import ExpectChangeOperator, ListItemFieldMatchOperator
+from jycm.path import PathRegistry
 
 
 def test_only_primitive():
@@ -830,3 +834,488 @@ def test_compare_list_with_order_fast():
     }
 
     assert expected == ycm.to_dict(no_pairs=True)
+
+
+def test_fingerprint_with_moved_identical_items():
+    left = {
+        "list": [
+            {"a": [1, 2, {"b": 3}], "c": "c"},
+            {"a": [4, 5, {"b": 6}], "c": "c"},
+        ]
+    }
+
+    right = {
+        "list": [
+            {"a": [0], "c": "c"},
+            {"a": [1, 2, {"b": 3}], "c": "c"},
+            {"a": [4, 5, {"b": 6}], "c": "c"},
+        ]
+    }
+
+    ycm = YouchamaJsonDiffer(left, right)
+    ycm.diff()
+
+    ycm_no_fingerprint = YouchamaJsonDiffer(left, right, use_fingerprint=False)
+    ycm_no_fingerprint.diff()
+
+    assert ycm.to_dict() == ycm_no_fingerprint.to_dict()
+    assert {'left': 3, 'right': 3, 'left_path': 'list->[0]->a->[2]->b',
+            'right_path': 'list->[1]->a->[2]->b'} in ycm.to_dict()['just4vis:pairs']
+
+
+def test_fingerprint_with_operator_inside_identical_subtree():
+    left = {"a": {"b": {"c": 1}}, "nan": [float("nan")], "bool": [1]}
+    right = {"a": {"b": {"c": 1}}, "nan": [float("nan")], "bool": [True]}
+
+    ycm = YouchamaJsonDiffer(left, right, custom_operators=[
+        ExpectChangeOperator("^a->b->c$")
+    ])
+    ycm.diff()
+
+    assert ycm.fingerprint_index.is_identical(left["a"], right["a"]) is False
+    assert ycm.fingerprint_index.is_identical(left["nan"], right["nan"]) is False
+    assert ycm.fingerprint_index.is_identical(left["bool"], right["bool"]) is False
+
+    result = ycm.to_dict(no_pairs=True)
+    assert result['operator:expectChange'] == [
+        {'left': 1, 'right': 1, 'left_path': 'a->b->c', 'right_path': 'a->b->c',
+         'pass': False, 'path_regex': '^a->b->c$'}
+    ]
+    assert [r['left_path'] for r in result['list:remove']] == ['nan->[0]']
+
+
+def test_lcs_engine_vectorized():
+    left = {
+        "list": [1, 2.0, True, {"a": [1, 2]}, {"a": [3, 4]}, [5, 6], "x", {"b": 1}],
+        "set": [[1, 2], [3, 4]]
+    }
+
+    right = {
+        "list": [1.0, 2, 1, {"a": [2, 1]}, [6, 5], "y", {"b": 1, "c": 2}, "x"],
+        "set": [[4, 3], [2, 1]]
+    }
+
+    for engine in ["table", "vectorized"]:
+        ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func([
+            "^set", "->a$"
+        ]), lcs_engine=engine)
+        ycm.diff()
+        ycm_no_fingerprint = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func([
+            "^set", "->a$"
+        ]), use_fingerprint=False)
+        ycm_no_fingerprint.diff()
+
+        assert ycm.to_dict() == ycm_no_fingerprint.to_dict()
+
+
+def test_lcs_engine_unknown():
+    try:
+        YouchamaJsonDiffer({}, {}, lcs_engine="unknown")
+    except ValueError as e:
+        assert "unknown" in str(e)
+    else:
+        raise AssertionError("ValueError expected")
+
+
+def test_lcs_engine_myers():
+    left = {"list": [{"v": i, "w": 0} for i in range(3000)]}
+    right = {"list": [{"v": i, "w": 0} for i in range(3000)]}
+    right["list"][5]["v"] = -1
+    right["list"].insert(10, {"v": "new"})
+    del right["list"][100]
+
+    ycm = YouchamaJsonDiffer(left, right, lcs_engine="myers")
+    ycm.diff()
+
+    expected = {
+        'list:add': [
+            {'left': '__NON_EXIST__', 'right': {'v': 'new'}, 'left_path': '', 'right_path': 'list->[10]'}
+        ],
+        'list:remove': [
+            {'left': {'v': 99, 'w': 0}, 'right': '__NON_EXIST__', 'left_path': 'list->[99]', 'right_path': ''}
+        ],
+        'value_changes': [
+            {'left': 5, 'right': -1, 'left_path': 'list->[5]->v', 'right_path': 'list->[5]->v', 'old': 5, 'new': -1}
+        ]
+    }
+    assert ycm.to_dict(no_pairs=True) == expected
+
+
+def test_lcs_backtracking_long_list():
+    # used to raise RecursionError wrapped in DiffLevelException
+    left = {"list": list(range(3000))}
+    right = {"list": [*range(1500), -1, *range(1500, 3000)]}
+
+    ycm = YouchamaJsonDiffer(left, right, lcs_engine="vectorized")
+    ycm.diff()
+
+    assert ycm.to_dict(no_pairs=True) == {
+        'list:add': [
+            {'left': '__NON_EXIST__', 'right': -1, 'left_path': '', 'right_path': 'list->[1500]'}
+        ]
+    }
+
+    # the default table engine backtracks more steps than the recursion limit
+    left = {"list": list(range(1200))}
+    right = {"list": [*range(600), -1, *range(600, 1200)]}
+
+    ycm = YouchamaJsonDiffer(left, right)
+    ycm.diff()
+
+    assert ycm.to_dict(no_pairs=True) == {
+        'list:add': [
+            {'left': '__NON_EXIST__', 'right': -1, 'left_path': '', 'right_path': 'list->[600]'}
+        ]
+    }
+
+
+def test_list_score_matrix():
+    left = [{"a": 1, "b": 1}, {"a": 2, "b": 2}, 3]
+    right = [{"a": 2, "b": 2}, {"a": 1, "b": 0}, 3.0]
+
+    ycm = YouchamaJsonDiffer(left, right)
+    ycm.build_fingerprint_index()
+    score_matrix = ListScoreMatrix(ycm, TreeLevel(left=left, right=right, left_path=[], right_path=[], up=None))
+
+    assert score_matrix.equality_table().tolist() == [
+        [False, False, False],
+        [True, False, False],
+        [False, False, True],
+    ]
+    assert score_matrix.score(0, 1) == 0.5
+    assert score_matrix.is_equal(1, 0)
+    assert not score_matrix.is_equal(0, 1)
+    # identical items and items that can never be equal are decided without diffing
+    assert set(score_matrix.scores.keys()) == {(0, 1), (2, 2)}
+
+
+def test_assignment_engine_lapjv():
+    left = {"set": [{"id": i, "name": f"item-{i}", "value": i} for i in range(50)]}
+    right = {"set": [{"id": i, "name": f"item-{i}", "value": -i} for i in reversed(range(50))]}
+
+    kwargs = dict(ignore_order_func=make_ignore_order_func(["^set$"]))
+    expected = YouchamaJsonDiffer(left, right, **kwargs).get_diff()
+    assert YouchamaJsonDiffer(left, right, assignment_engine="lapjv", **kwargs).get_diff() == expected
+    assert len(expected["value_changes"]) == 49
+
+
+def test_split_assignment():
+    weights = [
+        [0, 0, 0, 0],
+        [0, 1, 0, 0.5],
+        [0, 0, 0, 0],
+        [0.5, 0.5, 1, 1],
+    ]
+
+    class TableScores:
+        level = None
+
+        @staticmethod
+        def score(left_index, right_index):
+            return weights[left_index][right_index]
+
+    def partial_matching(**kwargs):
+        ycm = YouchamaJsonDiffer([], [], **kwargs)
+        return ycm._list_without_order_partial_matching([0, 1, 2, 3], [0, 1, 2, 3], TableScores())
+
+    # the same matching as one assignment on the whole table unless asked to split it
+    assert partial_matching() == ([0, 2], [0, 2], [(1, 1), (3, 3)])
+    assert partial_matching(split_assignment=True) == ([0, 2], [0, 3], [(1, 1), (3, 2)])
+
+    left = {"set": [{"id": i, "name": f"item-{i}", "value": i} for i in range(30)]}
+    right = {"set": [{"id": i, "name": f"item-{i}", "value": -i} for i in reversed(range(30))]}
+    kwargs = dict(ignore_order_func=make_ignore_order_func(["^set$"]))
+    expected = YouchamaJsonDiffer(left, right, **kwargs).get_diff()
+    assert YouchamaJsonDiffer(left, right, split_assignment=True, **kwargs).get_diff() == expected
+
+
+def test_assignment_engine_unknown():
+    try:
+        YouchamaJsonDiffer({}, {}, assignment_engine="unknown")
+    except ValueError as e:
+        assert "unknown" in str(e)
+    else:
+        raise AssertionError("ValueError expected")
+
+
+def test_list_without_order_exact_matching_is_greedy():
+    left = {"s": [{"a": 1}, {"a": 1}, [1, 2], 3]}
+    right = {"s": [3, [2, 1], {"a": 1}, {"a": 1.0}, {"a": 1}]}
+
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func(["^s"]))
+    ycm.diff()
+    assert ycm.to_dict() == {
+        'just4vis:pairs': [
+            {'left': {'a': 1}, 'right': {'a': 1}, 'left_path': 's->[0]', 'right_path': 's->[2]'},
+            {'left': 1, 'right': 1, 'left_path': 's->[0]->a', 'right_path': 's->[2]->a'},
+            {'left': {'a': 1}, 'right': {'a': 1.0}, 'left_path': 's->[1]', 'right_path': 's->[3]'},
+            {'left': 1, 'right': 1.0, 'left_path': 's->[1]->a', 'right_path': 's->[3]->a'},
+            {'left': [1, 2], 'right': [2, 1], 'left_path': 's->[2]', 'right_path': 's->[1]'},
+            {'left': 1, 'right': 1, 'left_path': 's->[2]->[0]', 'right_path': 's->[1]->[1]'},
+            {'left': 2, 'right': 2, 'left_path': 's->[2]->[1]', 'right_path': 's->[1]->[0]'},
+            {'left': 3, 'right': 3, 'left_path': 's->[3]', 'right_path': 's->[0]'}
+        ],
+        'list:add': [
+            {'left': '__NON_EXIST__', 'right': {'a': 1}, 'left_path': '', 'right_path': 's->[4]'}
+        ]
+    }
+
+
+def test_tree_level_lazy_paths():
+    registry = PathRegistry()
+    left_node, right_node = registry.from_list(["a", 0, "b"]), registry.from_list(["a", 1])
+    level = TreeLevel(left=1, right=2, up=None, left_path_node=left_node, right_path_node=right_node,
+                      diff=lambda _level, _drill: (True, _level.left))
+
+    assert not hasattr(level, "__dict__")
+    assert level.left_path == ["a", 0, "b"]
+    assert level.right_path == ["a", 1]
+    assert level.get_path() == "a->[0]->b"
+    assert level.diff(False) == (True, 1)
+
+    level.left_path = ["c"]
+    assert level.left_path_node is None
+    assert level.to_dict() == {"left": 1, "right": 2, "left_path": ["c"], "right_path": ["a", 1]}
+    assert TreeLevel(left=1, right=2, left_path=[], right_path=[], up=None).diff is None
+
+
+def test_score_without_tree_level():
+    left = {"a": [1, {"x": 1, "y": 2}], "b": "s", "c": 1, "d": [1, 2]}
+    right = {"a": [1, {"x": 1, "y": 3}], "b": "t", "c": "1", "d": [1, 2]}
+
+    differ = YouchamaJsonDiffer(left, right, use_cache=False)
+    lazy_differ = YouchamaJsonDiffer(left, right, use_cache=False)
+    for key in left:
+        left_path_node, right_path_node = differ.path_registry.from_list([key]), differ.path_registry.from_list([key])
+        expected = differ.diff_level(TreeLevel(left=left[key], right=right[key], up=None,
+                                               left_path_node=left_path_node, right_path_node=right_path_node), True)
+        assert lazy_differ.score(left[key], right[key], left_path_node, right_path_node) == expected
+
+    level = TreeLevel(left=[{"x": 1}, 2], right=[2, {"x": 1}], left_path=["a"], right_path=["a"], up=None)
+    score_matrix = ListScoreMatrix(differ, level)
+    assert score_matrix.score(0, 1) == 1
+
+    pair = ListItemPair(value=None, left_index=0, right_index=1, score_matrix=score_matrix)
+    assert pair.level is pair.level
+    assert pair.level.up is level
+    assert pair.level.left == {"x": 1}
+    assert pair.level.left_path == ["a", 0]
+    assert pair.level.right_path == ["a", 1]
+
+
+def test_type_handlers():
+    left = {"a": (1, 2, {"x": (3, 4)}), "b": 1, "c": "x"}
+    right = {"a": [1, 3, {"x": [3, 4]}], "b": 1.0, "c": 1}
+
+    ycm = YouchamaJsonDiffer(left, right)
+    ycm.diff()
+    assert ycm.to_dict(no_pairs=True) == {
+        "list:add": [{"left": "__NON_EXIST__", "right": 3, "left_path": "", "right_path": "a->[1]"}],
+        "list:remove": [{"left": 2, "right": "__NON_EXIST__", "left_path": "a->[1]", "right_path": ""}],
+        "value_changes": [{"left": "x", "right": 1, "left_path": "c", "right_path": "c", "old": "x", "new": 1}]
+    }
+
+    def int_float_differ(differ, level, drill):
+        if not drill:
+            differ.report("int:float", level, {"old": level.left, "new": level.right})
+        return 0
+
+    ycm = YouchamaJsonDiffer({"b": 1}, {"b": 1.0}, type_handlers={(int, float): int_float_differ})
+    ycm.diff()
+    assert ycm.to_dict(no_pairs=True) == {
+        "int:float": [{"left": 1, "right": 1.0, "left_path": "b", "right_path": "b", "old": 1, "new": 1.0}]
+    }
+
+
+def test_type_handlers_of_identical_containers():
+    def seen_dict_differ(differ, level, drill):
+        if not drill:
+            differ.report("seen", level)
+        return differ.compare_dict(level, drill)
+
+    left = {"a": {"x": 1}, "b": [{"y": [2]}, 3], "c": [{"y": [2]}]}
+    right = {"a": {"x": 1}, "b": [{"y": [2]}, 4], "c": [{"y": [2]}]}
+    expected = ["", "a", "b->[0]", "c->[0]"]
+    for use_fingerprint in [True, False]:
+        ycm = YouchamaJsonDiffer(left, right, type_handlers={(dict, dict): seen_dict_differ},
+                                 use_fingerprint=use_fingerprint)
+        ycm.diff()
+        # the handler is called on identical dicts, also deep inside identical arrays
+        assert [r["left_path"] for r in ycm.to_dict(no_pairs=True)["seen"]] == expected
+
+
+def test_diff_level_exception_message():
+    class Broken:
+        def __ne__(self, other):
+            raise RuntimeError("broken")
+
+    ycm = YouchamaJsonDiffer({"a": Broken()}, {"a": 1})
+    try:
+        ycm.diff()
+    except DiffLevelException as e:
+        assert isinstance(e.error, RuntimeError)
+        assert e.level.left_path == ["a"]
+        assert str(e).startswith("Error broken [drill=False] when compare [")
+        return
+    assert False
+
+
+def test_is_exact():
+    rng = random.Random(0)
+
+    def make_value(depth):
+        kind = rng.randint(0, 3) if depth > 0 else 0
+        if kind == 0:
+            return rng.choice([0, 1, 1.0, "a", None, True])
+        if kind == 1:
+            return {rng.choice("abc"): make_value(depth - 1) for _ in range(rng.randint(0, 3))}
+        return [make_value(depth - 1) for _ in range(rng.randint(0, 3))]
+
+    for _ in range(500):
+        left, right = make_value(3), make_value(3)
+        if rng.random() < 0.3:
+            right = copy.deepcopy(left)
+        kwargs = rng.choice([
+            {},
+            {"use_fingerprint": False},
+            {"ignore_order_func": make_ignore_order_func(["^$", r"\[\d+\]$"])},
+            {"custom_operators": [ExpectChangeOperator("->a$")]},
+        ])
+        ycm = YouchamaJsonDiffer({"v": left}, {"v": right}, **kwargs)
+        if ycm.use_fingerprint:
+            ycm.build_fingerprint_index()
+        node = ycm.path_registry.from_list(["v"])
+        expected = ycm.score(left, right, node, node) == 1
+
+        ycm = YouchamaJsonDiffer({"v": left}, {"v": right}, **kwargs)
+        if ycm.use_fingerprint:
+            ycm.build_fingerprint_index()
+        node = ycm.path_registry.from_list(["v"])
+        assert ycm.is_exact(left, right, node, node) == expected, (left, right, kwargs)
+
+
+def test_is_exact_of_subclass():
+    class CaseInsensitiveDiffer(YouchamaJsonDiffer):
+        def compare_primitive(self, level, drill=False):
+            if type(level.left) == str and type(level.right) == str and level.left.lower() == level.right.lower():
+                return 1
+            return super().compare_primitive(level, drill)
+
+    left, right = {"v": ["A", {"b": "C"}]}, {"v": ["a", {"b": "c"}]}
+    for kwargs in [{}, {"ignore_order_func": make_ignore_order_func(["^v$"])}]:
+        ycm = CaseInsensitiveDiffer(left, right, **kwargs)
+        ycm.build_fingerprint_index()
+        node = ycm.path_registry.from_list(["v"])
+        assert ycm.is_exact(left["v"], right["v"], node, node)
+        assert ycm.score(left["v"], right["v"], node, node) == 1
+
+        assert CaseInsensitiveDiffer(left, right, **kwargs).get_diff(no_pairs=True) == {}
+
+
+def test_replay_list_matching():
+    class LCSCountingDiffer(YouchamaJsonDiffer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.lcs_paths = []
+
+        def generate_lcs_pair_list(self, level, lcs_engine=None, score_matrix=None):
+            self.lcs_paths.append(level.get_path())
+            return super().generate_lcs_pair_list(level, lcs_engine, score_matrix)
+
+    left = {"a": [{"v": list(range(10))}]}
+    right = {"a": [{"v": [*range(1, 10), 11]}]}
+
+    expected = LCSCountingDiffer(left, right, use_cache=False)
+    expected.diff()
+    assert expected.lcs_paths == ["a", "a->[0]->v", "a->[0]->v"]
+
+    ycm = LCSCountingDiffer(left, right)
+    ycm.diff()
+    # the report phase replays the matching of drill mode
+    assert ycm.lcs_paths == ["a", "a->[0]->v"]
+    assert ycm.to_dict() == expected.to_dict()
+
+
+def test_content_cache():
+    shared = [{"x": [1, 2, 3], "y": {"z": 1}}, {"x": [3, 2], "y": {"z": 2}}]
+    left = {"a": [copy.deepcopy(shared[i % 2]) for i in range(10)], "b": [1, 2]}
+    right = {"a": [copy.deepcopy(shared[i % 2]) for i in range(10)], "b": [2, 1]}
+    for item in right["a"]:
+        item["x"].append(4)
+
+    for ignore_order_func in [None, make_ignore_order_func(["^a$", r"->x$"]), make_ignore_order_func([r"^a->\[1\]"])]:
+        expected = YouchamaJsonDiffer(left, right, ignore_order_func=ignore_order_func, use_content_cache=False)
+        expected.diff()
+        assert expected.get_content_cache_stats() is None
+
+        ycm = YouchamaJsonDiffer(left, right, ignore_order_func=ignore_order_func)
+        ycm.diff()
+        assert ycm.to_dict() == expected.to_dict()
+        assert ycm.get_content_cache_stats()["hits"] > 0
+
+    # a custom function may look at anything
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=lambda level, drill: False)
+    assert ycm.get_content_cache_stats() is None
+
+
+def make_nested(depth, leaf):
+    """Arrays and dicts nested alternately `depth` levels deep
+
+    """
+    value = leaf
+    for i in range(depth):
+        value = {"k": value, "n": i} if i % 2 else [1, value, {"n": i}]
+    return value
+
+
+def test_stack_traversal_engine():
+    rng = random.Random(0)
+
+    def make_value(depth):
+        kind = rng.randint(0, 3) if depth > 0 else 0
+        if kind == 0:
+            return rng.choice([0, 1, 1.0, "a", None, True])
+        if kind == 1:
+            return {rng.choice("abc"): make_value(depth - 1) for _ in range(rng.randint(0, 3))}
+        return [make_value(depth - 1) for _ in range(rng.randint(0, 4))]
+
+    for _ in range(300):
+        left, right = make_value(4), make_value(4)
+        kwargs = rng.choice([
+            {},
+            {"use_cache": False},
+            {"fast_mode": True},
+            {"ignore_order_func": make_ignore_order_func(["^$", r"\[\d+\]$"])},
+            {"custom_operators": [ExpectChangeOperator("->a$")]},
+        ])
+        expected = YouchamaJsonDiffer(left, right, **kwargs)
+        ycm = YouchamaJsonDiffer(left, right, traversal_engine="stack", **kwargs)
+        assert ycm.diff() == expected.diff()
+        assert ycm.to_dict() == expected.to_dict(), (left, right, kwargs)
+
+    # drills nested deeper than DRILL_DEPTH_BUDGET are deferred
+    left, right = make_nested(48, {"v": 1, "w": [1, 2]}), make_nested(48, {"v": 2, "w": [2]})
+    for kwargs in [{}, {"use_cache": False}, {"ignore_order_func": make_ignore_order_func([".*"])}]:
+        expected = YouchamaJsonDiffer(left, right, **kwargs)
+        expected.diff()
+        ycm = YouchamaJsonDiffer(left, right, traversal_engine="stack", **kwargs)
+        ycm.diff()
+        assert ycm.to_dict() == expected.to_dict()
+        assert len(ycm.to_dict()["value_changes"]) == 1
+
+
+def test_stack_traversal_engine_deep():
+    left, right = make_nested(3000, {"v": 1, "w": 1}), make_nested(3000, {"v": 2, "w": 1})
+
+    try:
+        YouchamaJsonDiffer(left, right).diff()
+        assert False
+    except DiffLevelException as e:
+        assert isinstance(e.error, RecursionError)
+
+    ycm = YouchamaJsonDiffer(left, right, traversal_engine="stack")
+    ycm.diff()
+    value_changes = ycm.to_dict()["value_changes"]
+    assert len(value_changes) == 1
+    assert value_changes[0]["old"] == 1 and value_changes[0]["new"] == 2
+    assert len(value_changes[0]["left_path"].split("->")) == 3001
@@ -0,0 +1,91 @@
+import itertools
+import random
+
+import numpy as np
+
+from jycm.km_matcher import ComponentMatcher, KMMatcher, LAPJVMatcher, connected_components
+
+
+def brute_force(weights):
+    n, m = len(weights), len(weights[0])
+    if n <= m:
+        return max(sum(weights[i][p[i]] for i in range(n)) for p in itertools.permutations(range(m), n))
+    return max(sum(weights[p[j]][j] for j in range(m)) for p in itertools.permutations(range(n), m))
+
+
+def test_lapjv_matcher():
+    rng = random.Random(0)
+    for _ in range(300):
+        n, m = rng.randint(1, 6), rng.randint(1, 6)
+        weights = [[rng.choice([0, 0.25, 0.5, 1, rng.random()]) for _ in range(m)] for _ in range(n)]
+
+        total, pairs = LAPJVMatcher(weights, use_scipy=False).solve()
+        assert abs(total - brute_force(weights)) < 1e-6
+        assert abs(total - KMMatcher(weights).solve()[0]) < 1e-4
+
+        assert len(pairs) == min(n, m)
+        assert len(set(x for x, _ in pairs)) == len(pairs)
+        assert len(set(y for _, y in pairs)) == len(pairs)
+        assert abs(sum(weights[x][y] for x, y in pairs) - total) < 1e-6
+
+
+def test_lapjv_matcher_pairs_order():
+    weights = [
+        [2., 0., 5., ],
+        [3., 4., 6., ],
+        [0., 0., 0., ],
+        [3., 100., 0., ],
+    ]
+    assert LAPJVMatcher(weights, use_scipy=False).solve() == KMMatcher(weights).solve()
+
+
+def test_connected_components():
+    weights = np.array([
+        [1., 0., 0., 0.],
+        [0., 0., 0., 0.],
+        [0., 2., 0., 3.],
+        [0., 0., 0., 4.],
+    ])
+    components = [(rows.tolist(), columns.tolist()) for rows, columns in connected_components(weights)]
+    assert components == [([0], [0]), ([2, 3], [1, 3])]
+
+    weights[1] = 1.
+    components = [(rows.tolist(), columns.tolist()) for rows, columns in connected_components(weights)]
+    assert components == [([0, 1, 2, 3], [0, 1, 2, 3])]
+
+
+def test_component_matcher():
+    rng = random.Random(0)
+    for _ in range(300):
+        n, m = rng.randint(1, 6), rng.randint(1, 6)
+        weights = [[rng.choice([0, 0, 0, 0.5, 1, rng.random()]) for _ in range(m)] for _ in range(n)]
+
+        matcher = ComponentMatcher(weights)
+        total, pairs = matcher.solve()
+        assert abs(total - brute_force(weights)) < 1e-6
+        assert len(set(x for x, _ in pairs)) == len(pairs)
+        assert len(set(y for _, y in pairs)) == len(pairs)
+        assert matcher.component_stats()["components"] == len(matcher.components)
+
+
+def test_component_matcher_ties():
+    weights = [
+        [0, 0, 0, 0],
+        [0, 1, 0, 0.5],
+        [0, 0, 0, 0],
+        [0.5, 0.5, 1, 1],
+    ]
+
+    def nonzero_pairs(matcher):
+        total, pairs = matcher.solve()
+        return total, {(x, y) for x, y in pairs if weights[x][y] != 0}
+
+    # equally good, but not the same matching; see split_assignment of YouchamaJsonDiffer
+    assert nonzero_pairs(KMMatcher(weights)) == (2, {(1, 1), (3, 3)})
+    assert nonzero_pairs(ComponentMatcher(weights)) == (2, {(1, 1), (3, 2)})
+
+    rng = random.Random(1)
+    for _ in range(300):
+        n, m = rng.randint(1, 6), rng.randint(1, 6)
+        weights = [[rng.choice([0, 0, 0.5, 1]) for _ in range(m)] for _ in range(n)]
+        assert abs(nonzero_pairs(ComponentMatcher(weights))[0] - nonzero_pairs(KMMatcher(weights))[0]) < 1e-6
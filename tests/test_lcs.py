@@ -0,0 +1,37 @@
+import random
+
+from jycm.lcs import myers_lcs
+
+
+def lcs_size_with_table(left, right):
+    dp_table = [[0 for _ in range(len(right) + 1)] for _ in range(len(left) + 1)]
+    for i in range(1, len(left) + 1):
+        for j in range(1, len(right) + 1):
+            if left[i - 1] == right[j - 1]:
+                dp_table[i][j] = dp_table[i - 1][j - 1] + 1
+            else:
+                dp_table[i][j] = max(dp_table[i - 1][j], dp_table[i][j - 1])
+    return dp_table[len(left)][len(right)]
+
+
+def test_myers_lcs():
+    rand = random.Random(0)
+    for _ in range(500):
+        left = [rand.randint(0, 3) for _ in range(rand.randint(0, 12))]
+        right = [rand.randint(0, 3) for _ in range(rand.randint(0, 12))]
+
+        pairs = myers_lcs(len(left), len(right), lambda i, j: left[i] == right[j])
+
+        assert len(pairs) == lcs_size_with_table(left, right)
+        assert all(left[i] == right[j] for i, j in pairs)
+        assert all(pairs[k][0] < pairs[k + 1][0] and pairs[k][1] < pairs[k + 1][1] for k in range(len(pairs) - 1))
+
+
+def test_myers_lcs_long():
+    left = list(range(100000))
+    right = [*left[:10], -1, *left[10:500], *left[501:]]
+    right[50000] = -2
+
+    pairs = myers_lcs(len(left), len(right), lambda i, j: left[i] == right[j])
+
+    assert len(pairs) == len(left) - 2
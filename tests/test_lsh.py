@@ -0,0 +1,35 @@
+import random
+
+from jycm.helper import make_ignore_order_func
+from jycm.jycm import YouchamaJsonDiffer
+from jycm.lsh import MinHashLSH, leaf_tokens
+
+
+def test_leaf_tokens():
+    assert sorted(leaf_tokens({"a": [1, 2.0, True], "b": {}, "c": "x"})) == sorted([
+        "->a->[]=1", "->a->[]=2", "->a->[]=1", "->b={}", "->c='x'"
+    ])
+    assert leaf_tokens(1) == ["=1"]
+
+
+def test_min_hash_lsh():
+    lsh = MinHashLSH(num_perm=128, bands=32, min_pairs=100)
+    assert lsh.candidate_pairs([1] * 9, [1] * 9) is None
+
+    left = [{"id": i, "name": f"name-{i}", "tags": ["a", "b", f"tag-{i}"], "value": i} for i in range(100)]
+    right = [{**item, "value": -1} for item in left]
+    pairs = lsh.candidate_pairs(left, right)
+    assert all((i, i) in pairs for i in range(100))
+    assert len(pairs) < 100 * 100 / 10
+
+
+def test_unordered_candidates():
+    rng = random.Random(0)
+    left = {"set": [{"id": i, "name": f"name-{i}", "tags": ["a", f"tag-{i}"], "value": i} for i in range(150)]}
+    right = {"set": [{**item, "value": -1} if rng.random() < 0.5 else item for item in left["set"]]}
+    rng.shuffle(right["set"])
+
+    kwargs = dict(ignore_order_func=make_ignore_order_func(["^set$"]))
+    expected = YouchamaJsonDiffer(left, right, **kwargs).get_diff()
+    ycm = YouchamaJsonDiffer(left, right, unordered_candidates=MinHashLSH(), **kwargs)
+    assert ycm.get_diff() == expected
@@ -1,8 +1,10 @@
 import math
 from typing import Tuple
 
-from jycm.jycm import TreeLevel, YouchamaJsonDiffer
-from jycm.operator import BaseOperator, ExpectChangeOperator, ExpectExistOperator, FloatInRangeOperator, IgnoreOperator
+from jycm.helper import make_ignore_order_func
+from jycm.jycm import DiffLevelException, TreeLevel, YouchamaJsonDiffer
+from jycm.operator import (BaseOperator, ExpectChangeOperator, ExpectExistOperator, FloatInRangeOperator,
+                           IgnoreOperator, ListItemFieldMatchOperator)
 
 
 def test_operator_expect_change():
@@ -239,3 +241,62 @@ def test_array():
             {'left': '__NON_EXIST__', 'right': 3, 'left_path': '', 'right_path': '[3]'}
         ]
     }
+
+
+def test_operator_list_item_field_match_join_key():
+    operator = ListItemFieldMatchOperator(r"\[\d+\]", [["meta", "id"], "version"])
+    assert operator.join_key({"meta": {"id": 1}, "version": 2}) == operator.join_key({"meta": {"id": 1.0}, "version": 2})
+    assert operator.join_key({"meta": {"id": 1}, "version": 2}) != operator.join_key({"meta": {"id": 1}, "version": 3})
+    assert operator.join_key({"meta": {"id": [1, {"a": 2}]}, "version": 2}) is not None
+    assert operator.join_key({"meta": {}, "version": 2}) is None
+    assert operator.join_key(1) is None
+
+    left = {"v": [
+        {"meta": {"id": 1}, "version": 1, "label": "1"},
+        {"meta": {"id": 1}, "version": 2, "label": "2"},
+        {"meta": {"id": 2}, "version": 1, "label": "3"},
+    ]}
+    right = {"v": [
+        {"meta": {"id": 2}, "version": 1, "label": "33"},
+        {"meta": {"id": 1}, "version": 2, "label": "22"},
+        {"meta": {"id": 3}, "version": 1, "label": "1"},
+    ]}
+
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func(["^v$"]), custom_operators=[
+        ListItemFieldMatchOperator(r"^v->\[\d+\]$", [["meta", "id"], "version"])
+    ])
+    ycm.diff()
+    assert sorted((r["left_path"], r["right_path"]) for r in ycm.to_dict()["operator:list:matchWithField"]) == [
+        ("v->[0]", "v->[2]"), ("v->[1]", "v->[1]"), ("v->[2]", "v->[0]")
+    ]
+    assert sorted((r["left_path"], r["right_path"]) for r in ycm.to_dict()["value_changes"]) == [
+        ("v->[0]->meta->id", "v->[2]->meta->id"), ("v->[1]->label", "v->[1]->label"),
+        ("v->[2]->label", "v->[0]->label")
+    ]
+
+
+def test_operator_list_item_field_match_join_key_fallback():
+    # fields of arrays ignoring order are equal by diffing only
+    left = {"v": [{"tags": [1, 2], "x": 1}, {"tags": [3], "x": 2}]}
+    right = {"v": [{"tags": [3], "x": 2}, {"tags": [2, 1], "x": 1}]}
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func(["^v$", "->tags$"]),
+                             custom_operators=[ListItemFieldMatchOperator(r"^v->\[\d+\]$", "tags")])
+    assert ycm.diff()
+
+    # items with different fields are equal if another operator says so
+    left = {"v": [{"id": 1, "x": 1}, {"id": 3, "x": 2}]}
+    right = {"v": [{"id": 3, "x": 2}, {"id": 2, "x": 1}]}
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func(["^v$"]), custom_operators=[
+        ListItemFieldMatchOperator(r"^v->\[\d+\]$", "id"), IgnoreOperator(r"^v->\[\d+\]->id$")
+    ])
+    assert ycm.diff()
+
+    # a right item without the field is not left out
+    right = {"v": [{"x": 2}, {"id": 1, "x": 1}]}
+    ycm = YouchamaJsonDiffer(left, right, ignore_order_func=make_ignore_order_func(["^v$"]),
+                             custom_operators=[ListItemFieldMatchOperator(r"^v->\[\d+\]$", "id")])
+    try:
+        ycm.diff()
+        assert False
+    except DiffLevelException as e:
+        assert isinstance(e.error, KeyError)
@@ -0,0 +1,100 @@
+from jycm.helper import make_ignore_order_func
+from jycm.jycm import YouchamaJsonDiffer
+from jycm.operator import ExpectChangeOperator, IgnoreOperator
+from jycm.parallel import ProcessPoolDiffExecutor, count_values
+from jycm.sink import CallbackRecordSink
+
+
+def make_doc(seed):
+    return {
+        "meta": {"version": seed, "tags": ["a", "b"]},
+        "users": [{"id": i, "name": f"u{i}", "roles": ["r", i % 3 + seed]} for i in range(12)],
+        "orders": [[i, {"sku": i * seed, "qty": [1, 2, i]}] for i in range(10)],
+        "settings": {f"k{i}": {"on": (i + seed) % 2 == 0, "v": [i, i + 1]} for i in range(8)},
+        "removed" if seed == 0 else "added": {"x": seed},
+    }
+
+
+def diff_records(left, right, **kwargs):
+    records = []
+    ycm = YouchamaJsonDiffer(left, right, record_sink=CallbackRecordSink(
+        lambda record: records.append((record.event, record.to_dict()))
+    ), **kwargs)
+    return ycm.diff(), records
+
+
+def test_count_values():
+    assert count_values(1, 100) == 1
+    assert count_values({"a": [1, 2, (3, 4)], "b": {}}, 100) == 8
+    assert count_values([[1] * 50] * 50, 10) == 10
+
+
+def test_parallel_executor():
+    left, right = make_doc(0), make_doc(1)
+    for kwargs in [
+        dict(fast_mode=True),
+        dict(fast_mode=True, traversal_engine="stack"),
+        dict(),
+        dict(ignore_order_func=make_ignore_order_func(["^users$", "roles"])),
+        dict(fast_mode=True, custom_operators=[ExpectChangeOperator("^meta->version$"),
+                                               IgnoreOperator(r"^orders->\d+->1->sku$")]),
+    ]:
+        expected = diff_records(left, right, **kwargs)
+        for min_size in [1, 5, 40, 1000]:
+            executor = ProcessPoolDiffExecutor(max_workers=2, min_size=min_size)
+            # records come in the same order
+            assert diff_records(left, right, parallel_executor=executor, **kwargs) == expected
+
+
+def test_parallel_executor_submits():
+    left, right = make_doc(0), make_doc(1)
+    executor = ProcessPoolDiffExecutor(max_workers=2, min_size=20)
+
+    submitted = []
+    submit = executor.submit
+
+    def record_submit(left_path, right_path, keys):
+        submitted.append(keys)
+        return submit(left_path, right_path, keys)
+
+    executor.submit = record_submit
+
+    ycm = YouchamaJsonDiffer(left, right, fast_mode=True, parallel_executor=executor)
+    ycm.diff()
+    assert ycm.to_dict() == YouchamaJsonDiffer(left, right, fast_mode=True).get_diff()
+    # small keys are packed with the next ones; nothing is left to diff in process
+    assert submitted == [["meta", "orders"], ["settings"], ["users"]]
+    # the pool is shut down after the diff
+    assert executor._pool is None
+
+
+def test_parallel_executor_in_process():
+    left, right = make_doc(0), make_doc(1)
+    expected = diff_records(left, right, fast_mode=True)
+
+    # subtrees are too small to be sent
+    executor = ProcessPoolDiffExecutor(max_workers=2, min_size=10 ** 6)
+    assert diff_records(left, right, fast_mode=True, parallel_executor=executor) == expected
+
+    # a lambda can not be shipped to workers
+    executor = ProcessPoolDiffExecutor(max_workers=2, min_size=1)
+    kwargs = dict(fast_mode=True, ignore_order_func=lambda level, drill: False)
+    assert diff_records(left, right, parallel_executor=executor, **kwargs) == expected
+
+
+def test_parallel_executor_array():
+    left, right = [make_doc(0), make_doc(0), 1, make_doc(0)], [make_doc(1), make_doc(0), 2]
+    expected = diff_records(left, right, fast_mode=True)
+
+    executor = ProcessPoolDiffExecutor(max_workers=2, min_size=20)
+    submitted = []
+    submit = executor.submit
+
+    def record_submit(left_path, right_path, keys):
+        submitted.append(keys)
+        return submit(left_path, right_path, keys)
+
+    executor.submit = record_submit
+    assert diff_records(left, right, fast_mode=True, parallel_executor=executor) == expected
+    # the identical item is skipped and the last one stays in process
+    assert submitted == [[0]]
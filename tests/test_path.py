@@ -0,0 +1,27 @@
+from jycm.path import PathRegistry, StructuralPaths
+
+
+def test_path_registry():
+    registry = PathRegistry()
+
+    node = registry.from_list(["a", 0, "b"])
+    assert node is registry.from_list(["a", 0, "b"])
+    assert node is registry.root.child("a").child(0).child("b")
+    assert node.parent is registry.from_list(["a", 0])
+    assert node.to_list() == ["a", 0, "b"]
+    assert registry.root.to_list() == []
+
+    # "[0]" and 0 are joined into the same string key but they are different paths
+    assert registry.from_list(["a", "[0]"]) is not registry.from_list(["a", 0])
+    assert len({registry.from_list(p).id for p in [[], ["a"], ["a", 0], ["a", "[0]"], ["a", 0, "b"]]}) == 5
+
+
+def test_structural_paths():
+    registry = PathRegistry()
+    structural_paths = StructuralPaths()
+
+    node = structural_paths.get(registry.from_list(["a", 3, "b", 1]))
+    assert node.to_list() == ["a", 0, "b", 0]
+    assert node is structural_paths.get(registry.from_list(["a", 0, "b", 7]))
+    assert structural_paths.get(registry.from_list(["a", 3])) is node.parent.parent
+    assert structural_paths.get(registry.root) is structural_paths.registry.root
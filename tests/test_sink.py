@@ -0,0 +1,80 @@
+import io
+import json
+
+from jycm.jycm import DiffLevelException, YouchamaJsonDiffer
+from jycm.operator import ListItemFieldMatchOperator
+from jycm.sink import CallbackRecordSink, NDJSONRecordSink
+
+LEFT = {"a": 1, "b": [1, 2, 3], "c": {"d": "e"}}
+RIGHT = {"a": 2, "b": [2, 3, 4], "f": True}
+
+
+def test_callback_record_sink():
+    expected = YouchamaJsonDiffer(LEFT, RIGHT).get_diff(no_pairs=True)
+
+    streamed = {}
+    ycm = YouchamaJsonDiffer(LEFT, RIGHT, record_sink=CallbackRecordSink(
+        lambda record: streamed.setdefault(record.event, []).append(record.to_dict()), no_pairs=True
+    ))
+    assert not ycm.diff()
+    assert streamed == expected
+    # nothing is kept in memory
+    assert ycm.to_dict() == {}
+    assert ycm.records == {}
+
+
+def test_ndjson_record_sink():
+    expected = YouchamaJsonDiffer(LEFT, RIGHT).get_diff()
+
+    fp = io.StringIO()
+    with NDJSONRecordSink(fp) as sink:
+        YouchamaJsonDiffer(LEFT, RIGHT, record_sink=sink).diff()
+
+    streamed = {}
+    for line in fp.getvalue().splitlines():
+        record = json.loads(line)
+        streamed.setdefault(record.pop("event"), []).append(record)
+    assert streamed == {event: records for event, records in expected.items() if len(records) > 0}
+
+
+def test_iter_records():
+    expected = YouchamaJsonDiffer(LEFT, RIGHT).get_diff(no_pairs=True)
+
+    streamed = {}
+    for record in YouchamaJsonDiffer(LEFT, RIGHT).iter_records(no_pairs=True, max_queue_size=1):
+        streamed.setdefault(record.event, []).append(record.to_dict())
+    assert streamed == expected
+
+    # stop early
+    records = YouchamaJsonDiffer(LEFT, RIGHT).iter_records(max_queue_size=1)
+    next(records)
+    records.close()
+
+
+def test_iter_records_restores_record_sink():
+    streamed = []
+    sink = CallbackRecordSink(lambda record: streamed.append(record.to_dict()))
+
+    ycm = YouchamaJsonDiffer(LEFT, RIGHT, record_sink=sink)
+    iterated = [record.to_dict() for record in ycm.iter_records()]
+    assert ycm.record_sink is sink
+    assert streamed == []
+
+    # stop early
+    ycm = YouchamaJsonDiffer(LEFT, RIGHT, record_sink=sink)
+    records = ycm.iter_records(max_queue_size=1)
+    next(records)
+    records.close()
+    assert ycm.record_sink is sink
+
+    YouchamaJsonDiffer(LEFT, RIGHT, record_sink=sink).diff()
+    assert streamed == iterated
+
+
+def test_iter_records_with_error():
+    ycm = YouchamaJsonDiffer([1], [2], custom_operators=[ListItemFieldMatchOperator(r"\[\d+\]", "id")])
+    try:
+        list(ycm.iter_records())
+    except DiffLevelException:
+        return
+    assert False